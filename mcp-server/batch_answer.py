@@ -0,0 +1,70 @@
+"""
+Batch Answer CLI
+Answers a file of questions in-process with batched retrieval and bounded
+generation concurrency, writing results as JSON lines
+
+Input is JSONL ({"id": ..., "question": ..., "route": ...}) or plain text
+with one question per line.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from tools.batch_tool import BatchAnswerer
+from tools.ollama_tool import OllamaTool
+from tools.rag_tool import RAGTool
+
+
+def read_items(path: str, default_route: str = None):
+    with (sys.stdin if path == "-" else open(path)) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+            else:
+                item = {"id": str(line_number), "question": line}
+            if default_route and not item.get("route"):
+                item["route"] = default_route
+            yield item
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions in batch")
+    parser.add_argument('input', help='JSONL or text file of questions ("-" for stdin)')
+    parser.add_argument('--output', default='-', help='Output JSONL file (default: stdout)')
+    parser.add_argument('--model', default='mistral-nemo', help='Model for classification and generation')
+    parser.add_argument('--route', choices=['FARMING', 'OLLAMA'],
+                        help='Route for items without one; skips intent classification')
+    parser.add_argument('--top-k', type=int, default=5, help='Chunks retrieved per FARMING question')
+    parser.add_argument('--concurrency', type=int, default=4, help='Generations in flight at once')
+    parser.add_argument('--window-size', type=int, default=64, help='Questions embedded and retrieved per batch')
+    args = parser.parse_args()
+
+    # POSTGRES items need the server's SQL pipeline; use POST /prompt/batch for those
+    answerer = BatchAnswerer(RAGTool(), OllamaTool())
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+
+    started = time.perf_counter()
+    count = errors = 0
+    try:
+        for result in answerer.run(read_items(args.input, args.route), model=args.model, top_k=args.top_k,
+                                   concurrency=args.concurrency, window_size=args.window_size):
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+            count += 1
+            errors += "error" in result
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Answered {count} questions ({errors} errors) in {elapsed:.1f}s "
+          f"({count / elapsed if elapsed else 0:.2f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
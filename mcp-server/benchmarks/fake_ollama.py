@@ -0,0 +1,133 @@
+"""
+Fake Ollama Server
+Implements /api/generate and /api/chat (streaming and non-streaming) with
+configurable per-token latency so the MCP server can be load-tested without a GPU
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+
+app = FastAPI()
+
+config = {
+    "token_latency_s": float(os.getenv("FAKE_OLLAMA_TOKEN_LATENCY_MS", 20)) / 1000,
+    "prompt_latency_s": float(os.getenv("FAKE_OLLAMA_PROMPT_LATENCY_MS", 50)) / 1000,
+    "swap_latency_s": float(os.getenv("FAKE_OLLAMA_SWAP_LATENCY_MS", 2000)) / 1000,
+    "answer_tokens": int(os.getenv("FAKE_OLLAMA_ANSWER_TOKENS", 120)),
+}
+
+state = {"loaded_model": None, "requests": 0, "swaps": 0}
+_model_lock = asyncio.Lock()
+
+_FILLER = ("Crop rotation improves soil structure and breaks pest cycles while legumes "
+           "fix nitrogen for the following season").split()
+
+
+def _router_reply(prompt: str) -> str:
+    """Answer the MCP router prompt with an intent derived from the user request"""
+    # Non-greedy and anchored at the line end: the router prompt's last line also
+    # contains quotes, and a greedy match would swallow its "FARMING" into the request
+    match = re.search(r'User Request: "(.*?)"\s*$', prompt, re.M)
+    request = (match.group(1) if match else prompt).lower()
+    if any(word in request for word in ("sql", "table", "database", "users", "rows")):
+        return "POSTGRES"
+    if any(word in request for word in ("crop", "soil", "farm", "livestock", "harvest", "irrigation")):
+        return "FARMING"
+    return "OLLAMA"
+
+
+def _reply_tokens(prompt: str) -> list:
+    if 'Reply ONLY with "POSTGRES", "FARMING", or "OLLAMA"' in prompt:
+        return [_router_reply(prompt)]
+    if "Reply ONLY with the SQL query" in prompt:
+        return ["SELECT", " filename,", " total_pages", " FROM", " documents", " ORDER", " BY", " id", " LIMIT", " 5"]
+    count = config["answer_tokens"]
+    return [(" " if i else "") + _FILLER[i % len(_FILLER)] for i in range(count)]
+
+
+async def _load(model: str):
+    # A single model is resident at a time, like a GPU that fits one model
+    async with _model_lock:
+        state["requests"] += 1
+        if state["loaded_model"] != model:
+            if state["loaded_model"] is not None:
+                state["swaps"] += 1
+            await asyncio.sleep(config["swap_latency_s"])
+            state["loaded_model"] = model
+    await asyncio.sleep(config["prompt_latency_s"])
+
+
+def _stats(tokens: list, started: float) -> dict:
+    duration_ns = int((time.perf_counter() - started) * 1e9)
+    return {"done": True, "total_duration": duration_ns, "eval_count": len(tokens)}
+
+
+async def _respond(body: dict, tokens: list, chunk_for):
+    started = time.perf_counter()
+    await _load(body.get("model", "llama3"))
+
+    if body.get("stream", True):
+        async def stream():
+            for token in tokens:
+                await asyncio.sleep(config["token_latency_s"])
+                yield json.dumps({"model": body.get("model"), "done": False, **chunk_for(token)}) + "\n"
+            yield json.dumps({"model": body.get("model"), **chunk_for(""), **_stats(tokens, started)}) + "\n"
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    await asyncio.sleep(config["token_latency_s"] * len(tokens))
+    return JSONResponse({"model": body.get("model"), **chunk_for("".join(tokens)), **_stats(tokens, started)})
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    body = await request.json()
+    tokens = _reply_tokens(body.get("prompt", ""))
+    return await _respond(body, tokens, lambda text: {"response": text})
+
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    body = await request.json()
+    messages = body.get("messages") or [{}]
+    tokens = _reply_tokens(messages[-1].get("content", ""))
+    return await _respond(body, tokens, lambda text: {"message": {"role": "assistant", "content": text}})
+
+
+@app.get("/api/stats")
+async def stats():
+    return {**state, **config}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for load testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--token-latency-ms', type=float, default=config["token_latency_s"] * 1000,
+                        help='Delay per generated token')
+    parser.add_argument('--prompt-latency-ms', type=float, default=config["prompt_latency_s"] * 1000,
+                        help='Fixed prompt-processing delay per request')
+    parser.add_argument('--swap-latency-ms', type=float, default=config["swap_latency_s"] * 1000,
+                        help='Delay when a request needs a different model than the loaded one')
+    parser.add_argument('--answer-tokens', type=int, default=config["answer_tokens"],
+                        help='Tokens generated for free-form answers')
+    args = parser.parse_args()
+
+    config["token_latency_s"] = args.token_latency_ms / 1000
+    config["prompt_latency_s"] = args.prompt_latency_ms / 1000
+    config["swap_latency_s"] = args.swap_latency_ms / 1000
+    config["answer_tokens"] = args.answer_tokens
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
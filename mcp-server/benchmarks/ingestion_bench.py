@@ -0,0 +1,187 @@
+"""
+Ingestion Micro-Benchmarks
+Measures throughput and peak memory of each ingestion stage on synthetic PDFs:
+extraction (pages/sec), chunking (chunks/sec), embedding (embeddings/sec)
+and database insert (rows/sec)
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../ingestion'))
+
+from pdf_processor import PDFProcessor
+from synthetic_pdf import write_pdf
+
+
+def measure(name: str, func, units: str, repeat: int = 1, trace_memory: bool = True) -> tuple:
+    """
+    Run a stage and record best-of-repeat throughput and peak memory
+
+    Timed runs are not traced; tracemalloc slows allocation-heavy stages
+    such as pdfplumber by an order of magnitude, so peak memory comes from
+    one extra traced run.
+
+    Returns:
+        Tuple of (stage result dict, return value of the last run)
+    """
+    best = None
+    value = None
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value, count = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    py_peak = None
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        _, py_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    rate = round(count / best, 2) if best else None
+    result = {
+        "stage": name,
+        "items": count,
+        "seconds": round(best, 4),
+        f"{units}_per_sec": rate,
+        "python_peak_mb": round(py_peak / 1e6, 2) if py_peak is not None else None,
+        # ru_maxrss is process-wide and monotonic; native (torch) memory shows up here
+        "process_max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    print(f"{name:<8} {count:>8} {units:<10} {best:8.3f}s  {rate:>10} {units}/s  "
+          f"py-peak {result['python_peak_mb']} MB")
+    return result, value
+
+
+def run(args) -> dict:
+    processor = PDFProcessor(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        write_pdf(pdf_path, pages=args.pages, lines_per_page=args.lines_per_page, seed=args.seed)
+        pdf_bytes = os.path.getsize(pdf_path)
+
+        def extract():
+            pages = processor.extract_text_from_pdf(pdf_path)
+            return pages, len(pages)
+
+        stage, pages = measure("extract", extract, "pages", args.repeat, not args.no_memory)
+        results.append(stage)
+
+    def chunk():
+        chunks = []
+        for page in pages:
+            chunks.extend(processor.chunk_text(page['text'], page['page_number']))
+        return chunks, len(chunks)
+
+    stage, chunks = measure("chunk", chunk, "chunks", args.repeat, not args.no_memory)
+    results.append(stage)
+
+    embeddings = None
+    if not args.skip_embed:
+        from embeddings import EmbeddingModel
+        model = EmbeddingModel()
+        texts = [c['content'] for c in chunks]
+        model.embed_batch(texts[:args.batch_size], batch_size=args.batch_size)  # warm-up
+
+        def embed():
+            vectors = model.embed_batch(texts, batch_size=args.batch_size)
+            return vectors, len(vectors)
+
+        stage, embeddings = measure("embed", embed, "embeddings", args.repeat, not args.no_memory)
+        results.append(stage)
+
+    if args.with_db:
+        from vector_store import VectorStore
+        store = VectorStore()
+        vectors = embeddings or [[0.0] * args.dimension for _ in chunks]
+        doc_metadata = {'filename': 'bench.pdf', 'file_hash': 'bench', 'total_pages': len(pages)}
+
+        def insert():
+            # Rolled back afterwards so the benchmark leaves no rows behind
+            try:
+                document_id = store.insert_document(doc_metadata)
+                store.insert_chunks(document_id, chunks, vectors)
+            finally:
+                store.conn.rollback()
+            return None, len(chunks)
+
+        try:
+            stage, _ = measure("insert", insert, "rows", args.repeat, not args.no_memory)
+            results.append(stage)
+        finally:
+            store.close()
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {
+            "pages": args.pages,
+            "lines_per_page": args.lines_per_page,
+            "chunk_size": args.chunk_size,
+            "chunk_overlap": args.chunk_overlap,
+            "batch_size": args.batch_size,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "pdf_bytes": pdf_bytes,
+        },
+        "stages": results,
+    }
+
+
+def compare(current: dict, previous: dict):
+    """Print per-stage throughput ratios against a previous results file"""
+    before = {s["stage"]: s for s in previous.get("stages", [])}
+    print("\nComparison (current / previous throughput):")
+    for stage in current["stages"]:
+        old = before.get(stage["stage"])
+        key = next(k for k in stage if k.endswith("_per_sec"))
+        if old and old.get(key):
+            print(f"  {stage['stage']:<8} {stage[key] / old[key]:.2f}x  ({old[key]} -> {stage[key]} {key})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion stages on synthetic PDFs")
+    parser.add_argument('--pages', type=int, default=50, help='Pages in the synthetic PDF')
+    parser.add_argument('--lines-per-page', type=int, default=45, help='Text lines per page')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Chunk size in characters')
+    parser.add_argument('--chunk-overlap', type=int, default=50, help='Chunk overlap in characters')
+    parser.add_argument('--batch-size', type=int, default=32, help='Embedding batch size')
+    parser.add_argument('--dimension', type=int, default=384, help='Vector size when --skip-embed is used with --with-db')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage (best is reported)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the PDF text')
+    parser.add_argument('--skip-embed', action='store_true', help='Skip the embedding stage')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the traced peak-memory run per stage')
+    parser.add_argument('--with-db', action='store_true', help='Benchmark inserts (rolled back) against POSTGRES_*')
+    parser.add_argument('--output', help='Write results JSON to this file')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Load Test
+Drives /prompt at a fixed concurrency across the three intents and reports
+throughput and latency percentiles, optionally failing on regression
+against a stored baseline
+"""
+
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+
+
+QUESTIONS = {
+    "FARMING": [
+        "What are the best practices for crop rotation?",
+        "How do I improve soil health before planting?",
+        "When should irrigation start for young crops?",
+    ],
+    "POSTGRES": [
+        "List the rows in the documents table",
+        "How many users are in the database?",
+        "Show the largest documents by total pages from the table",
+    ],
+    "OLLAMA": [
+        "Write a haiku about autumn",
+        "Explain what a Python decorator is",
+        "Tell me a joke",
+    ],
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float, misrouted: int = 0) -> Dict:
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count + errors,
+        # Misrouted requests count as errors: their latency belongs to another route
+        "errors": errors,
+        "misrouted": misrouted,
+        "throughput_rps": round(count / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+    }
+
+
+def run_load(url: str, model: str, concurrency: int, total: int, intents: List[str], timeout: float) -> Dict:
+    results = {intent: [] for intent in intents}
+    errors = {intent: 0 for intent in intents}
+    misrouted = {intent: 0 for intent in intents}
+    lock = threading.Lock()
+    session_local = threading.local()
+
+    def send(i: int):
+        intent = intents[i % len(intents)]
+        questions = QUESTIONS[intent]
+        question = questions[(i // len(intents)) % len(questions)]
+        session = getattr(session_local, "session", None)
+        if session is None:
+            session = session_local.session = requests.Session()
+
+        start = time.perf_counter()
+        try:
+            response = session.post(
+                f"{url}/prompt",
+                json={"messages": [{"role": "user", "content": question}], "model": model},
+                timeout=timeout
+            )
+            ok = response.status_code == 200
+            # The server reports the route it chose; a wrong one must not pass as a fast success
+            routed = response.headers.get("X-MCP-Intent")
+            wrong_route = ok and routed != intent
+        except requests.RequestException:
+            ok, wrong_route, routed = False, False, None
+        elapsed = time.perf_counter() - start
+
+        with lock:
+            if wrong_route:
+                misrouted[intent] += 1
+                errors[intent] += 1
+                if misrouted[intent] == 1:
+                    print(f"Misrouted {intent} question to {routed}: {question!r}", file=sys.stderr)
+            elif ok:
+                results[intent].append(elapsed)
+            else:
+                errors[intent] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(total)))
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in results.values() for value in values]
+    report = {
+        "config": {"concurrency": concurrency, "requests": total, "model": model, "intents": intents},
+        "overall": summarize(all_latencies, sum(errors.values()), elapsed, sum(misrouted.values())),
+        "by_intent": {
+            intent: summarize(results[intent], errors[intent], elapsed, misrouted[intent]) for intent in intents
+        },
+    }
+    return report
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare a report against a baseline
+
+    Returns:
+        List of regression descriptions (empty if none)
+    """
+    regressions = []
+    sections = [("overall", report["overall"], baseline.get("overall", {}))]
+    for intent, summary in report["by_intent"].items():
+        sections.append((intent, summary, baseline.get("by_intent", {}).get(intent, {})))
+
+    for name, current, base in sections:
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if base.get(key) and current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {current[key]} > {base[key]} (+{tolerance:.0%})")
+        if base.get("throughput_rps") and current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name} throughput_rps: {current['throughput_rps']} < {base['throughput_rps']} (-{tolerance:.0%})"
+            )
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name} errors: {current['errors']} > {base.get('errors', 0)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the MCP server /prompt endpoint")
+    parser.add_argument('--url', default='http://localhost:8002', help='MCP server base URL')
+    parser.add_argument('--model', default='llama3', help='Model sent with each request')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=200, help='Total requests')
+    parser.add_argument('--intents', default='FARMING,POSTGRES,OLLAMA',
+                        help='Comma-separated intents to mix (round-robin)')
+    parser.add_argument('--timeout', type=float, default=120, help='Per-request timeout in seconds')
+    parser.add_argument('--warmup', type=int, default=6, help='Requests sent before measuring')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='Baseline JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative regression against the baseline (default 0.2)')
+    args = parser.parse_args()
+
+    intents = [i.strip().upper() for i in args.intents.split(",") if i.strip()]
+    unknown = [i for i in intents if i not in QUESTIONS]
+    if unknown:
+        parser.error(f"Unknown intents: {', '.join(unknown)}")
+
+    if args.warmup:
+        run_load(args.url, args.model, min(args.concurrency, args.warmup), args.warmup, intents, args.timeout)
+
+    report = run_load(args.url, args.model, args.concurrency, args.requests, intents, args.timeout)
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if report["overall"]["misrouted"]:
+        print(f"\n{report['overall']['misrouted']} request(s) answered by the wrong route; "
+              "per-intent latencies are not comparable")
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
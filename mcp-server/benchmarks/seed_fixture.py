@@ -0,0 +1,70 @@
+"""
+Benchmark Fixture Seeder
+Fills a Postgres/pgvector database with synthetic documents and embeddings
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../ingestion'))
+
+from vector_store import VectorStore
+
+
+def random_unit_vector(rng: random.Random, dimension: int) -> list:
+    values = [rng.gauss(0, 1) for _ in range(dimension)]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic documents for load tests")
+    parser.add_argument('--documents', type=int, default=50, help='Number of documents')
+    parser.add_argument('--chunks-per-document', type=int, default=200, help='Chunks per document')
+    parser.add_argument('--dimension', type=int, default=384, help='Embedding dimension')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    store = VectorStore()
+
+    try:
+        for doc_index in range(args.documents):
+            filename = f"bench_doc_{doc_index:04d}.pdf"
+            doc_metadata = {
+                'filename': filename,
+                'file_hash': f"bench-{args.seed}-{doc_index:04d}",
+                'file_size': 0,
+                'last_modified': datetime.now(),
+                'total_pages': max(1, args.chunks_per_document // 4),
+                'chunk_count': args.chunks_per_document
+            }
+            chunks = [
+                {
+                    'content': f"Synthetic farming passage {i} of {filename} about crop rotation and soil health.",
+                    'page_number': i // 4 + 1,
+                    'chunk_index': i,
+                    'char_start': 0,
+                    'char_end': 0
+                }
+                for i in range(args.chunks_per_document)
+            ]
+            embeddings = [random_unit_vector(rng, args.dimension) for _ in chunks]
+            store.store_document(doc_metadata, chunks, embeddings)
+
+        # ivfflat centroids are computed at build time; rebuild now that data exists
+        with store.conn.cursor() as cur:
+            cur.execute("REINDEX INDEX idx_chunks_embedding")
+            cur.execute("ANALYZE document_chunks")
+        store.conn.commit()
+        print(f"Seeded {args.documents} documents x {args.chunks_per_document} chunks")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Synthetic PDF Generator
+Writes simple text PDFs without extra dependencies, for reproducible benchmarks
+"""
+
+import random
+from typing import List
+
+
+_WORDS = ("soil crop rotation nitrogen legume harvest irrigation yield compost tillage "
+          "livestock pasture seed fertilizer moisture drainage weed pest season field "
+          "wheat maize barley organic manure cover planting germination").split()
+
+
+def synthetic_paragraphs(rng: random.Random, lines: int) -> List[str]:
+    """Generate lines of pseudo-farming text with sentence breaks"""
+    out = []
+    for _ in range(lines):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 14))]
+        out.append(" ".join(words).capitalize() + ".")
+    return out
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 45, seed: int = 0):
+    """
+    Write a PDF with the given number of text pages
+
+    Args:
+        path: Output file
+        pages: Number of pages
+        lines_per_page: Text lines on each page
+        seed: Random seed for the text content
+    """
+    rng = random.Random(seed)
+    objects = []
+
+    # 1: catalog, 2: pages, 3: font, then a (page, content) pair per page
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] /Count {pages} >>")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for page_id in page_ids:
+        lines = synthetic_paragraphs(rng, lines_per_page)
+        text_ops = "\n".join(f"({_escape(line)}) '" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 790 Td\n{text_ops}\nET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+        xref_at = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode("latin-1"))
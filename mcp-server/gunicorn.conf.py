@@ -0,0 +1,62 @@
+"""
+Gunicorn configuration for multi-worker serving
+
+The app (including the SentenceTransformer model) is imported once in the
+master with preload_app, then workers are forked and share the model pages
+copy-on-write instead of each loading their own copy. Database connections
+opened during import are closed before forking; each worker opens its own
+pools sized by tools.postgres_tool.worker_pool_size().
+
+Each worker also has its own Ollama ModelScheduler. Its in-flight and
+loaded-model limits are the OLLAMA_MAX_* values divided by WEB_CONCURRENCY
+(tools.model_scheduler.per_worker_limit), but schedulers do not coordinate:
+two workers can still keep different models busy at once, so with several
+models in use OLLAMA_MAX_LOADED_MODELS=1 no longer prevents swaps. When
+requests mix models, keep one worker or let the Ollama server keep several
+models resident.
+
+    WEB_CONCURRENCY=4 gunicorn -c gunicorn.conf.py server:app
+"""
+
+import gc
+import os
+import shutil
+import sys
+import tempfile
+
+bind = os.getenv("MCP_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 300))
+graceful_timeout = 30
+
+# Metrics from all workers are aggregated through files in this directory.
+# It must be set (and emptied) before the preloaded app imports prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "mcp-prometheus"))
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def pre_fork(server, worker):
+    app_module = sys.modules.get("server")
+    if app_module is not None:
+        app_module.release_connections()
+    # Move everything allocated so far (model, tools) out of GC tracking so
+    # collections in workers don't write to, and un-share, those pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Split CPU threads between workers instead of every worker using all cores
+    try:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    except ImportError:
+        pass
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,268 @@
+"""
+Garbage Collection and Index Compaction
+Deletes superseded, duplicate and orphaned documents, vacuums the tables and
+rebuilds vector indexes once they are bloated, then reports the space and
+search time reclaimed
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from vector_store import VectorStore
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TABLES = ("documents", "document_chunks")
+# Per-tuple overhead of an index entry (item pointer + tuple header), in bytes
+INDEX_TUPLE_OVERHEAD = 16
+# Index pages are not packed completely full
+INDEX_FILL = 0.9
+
+
+class Compactor:
+    def __init__(self, vector_store: VectorStore, batch_size: int = 500,
+                 bloat_threshold: float = 1.5, churn_threshold: float = 0.2,
+                 sample_queries: int = 20, top_k: int = 5):
+        """
+        Initialize compactor
+
+        Args:
+            vector_store: Store to compact
+            batch_size: Documents deleted per transaction
+            bloat_threshold: Rebuild a vector index when its size exceeds this
+                multiple of the size a fresh build would have
+            churn_threshold: Also rebuild when this fraction of chunks was deleted,
+                since ivfflat centroids no longer match the remaining data
+            sample_queries: Queries timed before and after compaction (0 to skip)
+            top_k: Results per timed query
+        """
+        self.store = vector_store
+        self.batch_size = batch_size
+        self.bloat_threshold = bloat_threshold
+        self.churn_threshold = churn_threshold
+        self.sample_queries = sample_queries
+        self.top_k = top_k
+
+    def _query(self, sql: str, params=None) -> list:
+        self.store.ensure_connection()
+        with self.store.conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        self.store.conn.rollback()
+        return rows
+
+    def _maintenance(self, sql: str):
+        # VACUUM and REINDEX CONCURRENTLY cannot run inside a transaction block
+        conn = self.store.conn
+        conn.rollback()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+        finally:
+            conn.autocommit = False
+
+    def vector_indexes(self) -> List[str]:
+        """Names of the ivfflat/HNSW indexes on document_chunks, including partial ones"""
+        rows = self._query(
+            """
+            SELECT i.relname
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_am am ON am.oid = i.relam
+            WHERE x.indrelid = 'document_chunks'::regclass AND am.amname IN ('ivfflat', 'hnsw')
+            ORDER BY 1
+            """
+        )
+        return [row[0] for row in rows]
+
+    def sizes(self) -> Dict[str, int]:
+        """On-disk bytes of each table (with TOAST and indexes) and each vector index"""
+        sizes = {}
+        for table in TABLES:
+            sizes[table] = self._query("SELECT pg_total_relation_size(%s::regclass)", (table,))[0][0]
+        for index in self.vector_indexes():
+            sizes[index] = self._query("SELECT pg_relation_size(%s::regclass)", (index,))[0][0]
+        return sizes
+
+    def index_bloat(self, index: str) -> float:
+        """
+        Index size relative to the estimated size of a fresh build over the rows it covers
+        """
+        predicate = self._query(
+            "SELECT pg_get_expr(x.indpred, x.indrelid) FROM pg_index x WHERE x.indexrelid = %s::regclass",
+            (index,)
+        )[0][0]
+        where = f"WHERE {predicate}" if predicate else ""
+        live, avg_width = self._query(
+            f"SELECT count(*), coalesce(avg(pg_column_size(embedding)), 0) FROM document_chunks {where}"
+        )[0]
+        actual = self._query("SELECT pg_relation_size(%s::regclass)", (index,))[0][0]
+        expected = live * (float(avg_width) + INDEX_TUPLE_OVERHEAD) / INDEX_FILL
+        if not expected:
+            return float("inf") if actual else 1.0
+        return actual / expected
+
+    def sample_embeddings(self) -> List[str]:
+        """Embeddings of random live chunks, used as repeatable benchmark queries"""
+        if not self.sample_queries:
+            return []
+        rows = self._query(
+            "SELECT embedding::text FROM document_chunks "
+            "WHERE embedding IS NOT NULL AND document_id IS NOT NULL ORDER BY random() LIMIT %s",
+            (self.sample_queries,)
+        )
+        return [row[0] for row in rows]
+
+    def time_search(self, queries: List[str]) -> float:
+        """Median similarity_search latency in ms over queries, after a warm-up pass"""
+        if not queries:
+            return None
+        for query in queries:
+            self.store.similarity_search(query, top_k=self.top_k)
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            self.store.similarity_search(query, top_k=self.top_k)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def run(self, dry_run: bool = False, vacuum: bool = True, vacuum_full: bool = False,
+            force_reindex: bool = False) -> dict:
+        """
+        Collect stale documents and compact
+
+        Args:
+            dry_run: Only report what would be deleted
+            vacuum: VACUUM (ANALYZE) the tables after deleting
+            vacuum_full: Use VACUUM FULL, which returns space to the OS but locks the tables
+            force_reindex: Rebuild vector indexes regardless of bloat
+
+        Returns:
+            Report dict
+        """
+        stale = self.store.find_stale_documents()
+        # A document can match more than one category; delete it once
+        ids = sorted(set().union(*stale.values()))
+        report = {"stale": {kind: len(found) for kind, found in stale.items()}, "dry_run": dry_run}
+        for kind, found in stale.items():
+            logger.info(f"{kind}: {len(found)} document(s)")
+
+        if dry_run:
+            report["indexes"] = {index: {"bloat": round(self.index_bloat(index), 2)}
+                                 for index in self.vector_indexes()}
+            return report
+
+        total_chunks = self._query("SELECT count(*) FROM document_chunks")[0][0]
+        queries = self.sample_embeddings()
+        sizes_before = self.sizes()
+        search_before = self.time_search(queries)
+
+        deleted_docs, deleted_chunks = self.store.delete_documents(ids, batch_size=self.batch_size)
+        logger.info(f"Deleted {deleted_docs} document(s), {deleted_chunks} chunk(s)")
+        report["deleted"] = {"documents": deleted_docs, "chunks": deleted_chunks}
+
+        if vacuum:
+            for table in TABLES:
+                logger.info(f"Vacuuming {table}...")
+                self._maintenance(f"VACUUM ({'FULL, ' if vacuum_full else ''}ANALYZE) {table}")
+
+        churn = deleted_chunks / total_chunks if total_chunks else 0
+        report["indexes"] = {}
+        for index in self.vector_indexes():
+            bloat = self.index_bloat(index)
+            rebuild = force_reindex or bloat > self.bloat_threshold or churn > self.churn_threshold
+            if rebuild:
+                logger.info(f"Rebuilding {index} (bloat {bloat:.2f}x, churn {churn:.0%})...")
+                self._maintenance(f"REINDEX INDEX CONCURRENTLY {index}")
+            report["indexes"][index] = {"bloat": round(bloat, 2), "rebuilt": rebuild}
+
+        sizes_after = self.sizes()
+        search_after = self.time_search(queries)
+
+        report["bytes"] = {
+            name: {"before": sizes_before.get(name), "after": size,
+                   "reclaimed": (sizes_before.get(name) or 0) - size}
+            for name, size in sizes_after.items()
+        }
+        report["bytes_reclaimed"] = sum(sizes_before.values()) - sum(sizes_after.values())
+        report["search_p50_ms"] = {
+            "before": round(search_before, 2) if search_before is not None else None,
+            "after": round(search_after, 2) if search_after is not None else None,
+        }
+        return report
+
+
+def print_report(report: dict):
+    logger.info("\n" + "=" * 50)
+    logger.info("Compaction Summary:")
+    for kind, count in report["stale"].items():
+        logger.info(f"  {kind.capitalize():<11} {count} document(s)")
+    if report.get("deleted"):
+        logger.info(f"  Deleted:    {report['deleted']['documents']} document(s), "
+                    f"{report['deleted']['chunks']} chunk(s)")
+    for index, info in report.get("indexes", {}).items():
+        action = "rebuilt" if info.get("rebuilt") else "kept"
+        logger.info(f"  {index}: bloat {info['bloat']}x, {action}")
+    for name, sizes in report.get("bytes", {}).items():
+        logger.info(f"  {name}: {sizes['before'] / 1e6:.1f} MB -> {sizes['after'] / 1e6:.1f} MB")
+    if "bytes_reclaimed" in report:
+        logger.info(f"  Space reclaimed: {report['bytes_reclaimed'] / 1e6:.1f} MB")
+    search = report.get("search_p50_ms") or {}
+    if search.get("before") is not None:
+        logger.info(f"  Search p50: {search['before']} ms -> {search['after']} ms")
+    logger.info("=" * 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Delete stale documents and compact the vector database"
+    )
+    parser.add_argument('--dry-run', action='store_true', help='Report stale documents without deleting')
+    parser.add_argument('--batch-size', type=int, default=500, help='Documents deleted per transaction')
+    parser.add_argument('--bloat-threshold', type=float, default=1.5,
+                        help='Rebuild vector indexes above this size / fresh-build size ratio (default: 1.5)')
+    parser.add_argument('--churn-threshold', type=float, default=0.2,
+                        help='Rebuild vector indexes when this fraction of chunks was deleted (default: 0.2)')
+    parser.add_argument('--force-reindex', action='store_true', help='Rebuild vector indexes regardless of bloat')
+    parser.add_argument('--no-vacuum', action='store_true', help='Skip VACUUM')
+    parser.add_argument('--vacuum-full', action='store_true',
+                        help='VACUUM FULL: return space to the OS (locks the tables while it runs)')
+    parser.add_argument('--sample-queries', type=int, default=20,
+                        help='Searches timed before and after compaction (0 to skip)')
+    args = parser.parse_args()
+
+    store = VectorStore()
+    try:
+        compactor = Compactor(
+            store,
+            batch_size=args.batch_size,
+            bloat_threshold=args.bloat_threshold,
+            churn_threshold=args.churn_threshold,
+            sample_queries=args.sample_queries
+        )
+        report = compactor.run(
+            dry_run=args.dry_run,
+            vacuum=not args.no_vacuum,
+            vacuum_full=args.vacuum_full,
+            force_reindex=args.force_reindex
+        )
+        print_report(report)
+    except Exception as e:
+        logger.error(f"Compaction failed: {e}")
+        sys.exit(1)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -34,13 +34,15 @@ class EmbeddingModel:
         embedding = self.model.encode(text, convert_to_numpy=True)
         return embedding.tolist()
     
-    def embed_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+    def embed_batch(self, texts: List[str], batch_size: int = 32,
+                    show_progress: bool = True) -> List[List[float]]:
         """
         Generate embeddings for multiple texts in batches
         
         Args:
             texts: List of texts to embed
             batch_size: Number of texts to process at once
+            show_progress: Show a progress bar (off for server-side calls)
             
         Returns:
             List of embedding vectors
@@ -48,7 +50,7 @@ class EmbeddingModel:
         embeddings = self.model.encode(
             texts,
             batch_size=batch_size,
-            show_progress_bar=True,
+            show_progress_bar=show_progress,
             convert_to_numpy=True
         )
         return embeddings.tolist()
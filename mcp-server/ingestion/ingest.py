@@ -48,10 +48,31 @@ class DocumentIngestion:
             logger.error(f"Directory does not exist: {self.data_dir}")
             return []
         
-        pdf_files = list(self.data_dir.glob("*.pdf"))
+        # Subdirectories are categories, e.g. data_dir/soil/*.pdf -> category "soil"
+        pdf_files = sorted(self.data_dir.rglob("*.pdf"))
         logger.info(f"Found {len(pdf_files)} PDF files")
         return pdf_files
     
+    def _relative_parts(self, filepath: Path):
+        try:
+            return Path(filepath).resolve().relative_to(self.data_dir.resolve()).parts
+        except ValueError:
+            return None
+    
+    def document_name(self, filepath: Path) -> str:
+        """
+        Name a file is stored under: its path relative to data_dir (e.g.
+        "soil/guide.pdf"), so equal base names in different subdirectories
+        stay separate documents. Files outside data_dir use their base name.
+        """
+        parts = self._relative_parts(filepath)
+        return "/".join(parts) if parts else Path(filepath).name
+    
+    def get_category(self, filepath: Path):
+        """Category of a file: its first subdirectory under data_dir, if any"""
+        parts = self._relative_parts(filepath)
+        return parts[0] if parts and len(parts) > 1 else None
+    
     def ingest_file(self, filepath: Path, force: bool = False) -> bool:
         """
         Ingest a single PDF file
@@ -67,10 +88,11 @@ class DocumentIngestion:
             logger.info(f"Processing: {filepath.name}")
             
             # Process PDF
-            doc_metadata, chunks = self.pdf_processor.process_pdf(str(filepath))
+            doc_metadata, chunks = self.pdf_processor.process_pdf(str(filepath), self.document_name(filepath))
+            doc_metadata['category'] = self.get_category(filepath)
             
             # Check if already processed (unless force=True)
-            if not force and self.vector_store.is_file_processed(doc_metadata['file_hash']):
+            if not force and self.vector_store.is_file_processed(doc_metadata['file_hash'], doc_metadata['filename']):
                 logger.info(f"Skipping {filepath.name} - already processed")
                 return False
             
@@ -81,15 +103,71 @@ class DocumentIngestion:
             
             # Store in database
             logger.info(f"Storing in database...")
-            self.vector_store.store_document(doc_metadata, chunks, embeddings)
+            self.vector_store.store_document(doc_metadata, chunks, embeddings, replace=True)
             
-            logger.info(f"✓ Successfully ingested: {filepath.name}")
+            if doc_metadata.get('partial'):
+                logger.warning(f"⚠ Partially ingested {filepath.name}: {doc_metadata['metadata']['extraction']}")
+            else:
+                logger.info(f"✓ Successfully ingested: {filepath.name}")
             return True
             
         except Exception as e:
             logger.error(f"✗ Error processing {filepath.name}: {e}")
             return False
     
+    def ingest_batch(self, filepaths: list, embed_batch_size: int = 32) -> dict:
+        """
+        Ingest several PDF files with one embedding pass over all their chunks
+
+        Changed files replace their earlier version atomically.
+
+        Args:
+            filepaths: Paths to PDF files
+            embed_batch_size: Texts per embedding batch
+
+        Returns:
+            Dict of path -> "ingested", "partial" (stored with pages lost to the
+            extraction budgets), "skipped" or "error: <message>"
+        """
+        outcomes = {}
+        pending = []
+        for filepath in filepaths:
+            try:
+                # Hash first: unchanged files are skipped without extracting text
+                name = self.document_name(filepath)
+                if self.vector_store.is_file_processed(self.pdf_processor.calculate_file_hash(str(filepath)), name):
+                    outcomes[filepath] = "skipped"
+                    continue
+                doc_metadata, chunks = self.pdf_processor.process_pdf(str(filepath), name)
+                doc_metadata['category'] = self.get_category(filepath)
+                pending.append((filepath, doc_metadata, chunks))
+            except Exception as e:
+                logger.error(f"✗ Error processing {filepath.name}: {e}")
+                outcomes[filepath] = f"error: {e}"
+
+        if not pending:
+            return outcomes
+
+        texts = [chunk['content'] for _, _, chunks in pending for chunk in chunks]
+        embeddings = self.embedding_model.embed_batch(texts, batch_size=embed_batch_size, show_progress=False)
+
+        offset = 0
+        for filepath, doc_metadata, chunks in pending:
+            doc_embeddings = embeddings[offset:offset + len(chunks)]
+            offset += len(chunks)
+            try:
+                self.vector_store.store_document(doc_metadata, chunks, doc_embeddings, replace=True)
+                if doc_metadata.get('partial'):
+                    outcomes[filepath] = "partial"
+                    logger.warning(f"⚠ Partially ingested {filepath.name}: {doc_metadata['metadata']['extraction']}")
+                else:
+                    outcomes[filepath] = "ingested"
+                    logger.info(f"✓ Successfully ingested: {filepath.name}")
+            except Exception as e:
+                logger.error(f"✗ Error storing {filepath.name}: {e}")
+                outcomes[filepath] = f"error: {e}"
+        return outcomes
+
     def ingest_all(self, force: bool = False, incremental: bool = True):
         """
         Ingest all PDF files in the directory
@@ -129,6 +207,19 @@ class DocumentIngestion:
         logger.info(f"  Errors:    {error_count}")
         logger.info("="*50)
     
+    def create_category_indexes(self, min_chunks: int = 1000):
+        """
+        Create a partial ANN index for each category with at least min_chunks chunks
+        
+        Smaller categories are searched exactly, which needs no index.
+        """
+        for category, count in self.vector_store.list_categories():
+            if count < min_chunks:
+                logger.info(f"Skipping index for {category} ({count} chunks, searched exactly)")
+                continue
+            index_name = self.vector_store.create_category_index(category)
+            logger.info(f"✓ Index {index_name} ready for {category} ({count} chunks)")
+    
     def close(self):
         """Clean up resources"""
         self.vector_store.close()
@@ -163,12 +254,51 @@ def main():
         type=str,
         help='Process a single specific file'
     )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and ingest files as they are added, changed or deleted'
+    )
+    parser.add_argument(
+        '--status-port',
+        type=int,
+        default=int(os.getenv('WATCH_STATUS_PORT', 8003)),
+        help='Port for the watch-mode queue status endpoint (0 to disable)'
+    )
+    parser.add_argument(
+        '--poll',
+        action='store_true',
+        help='Watch by polling even when inotify is available'
+    )
+    parser.add_argument(
+        '--category-indexes',
+        action='store_true',
+        help='Create per-category partial vector indexes after ingesting'
+    )
+    parser.add_argument(
+        '--category-index-min-chunks',
+        type=int,
+        default=1000,
+        help='Only index categories with at least this many chunks (default: 1000)'
+    )
     
     args = parser.parse_args()
     
     try:
         ingestion = DocumentIngestion(data_dir=args.data_dir)
         
+        if args.watch:
+            from watch import IngestionWatcher, lower_priority
+            lower_priority()
+            watcher = IngestionWatcher(ingestion, use_inotify=not args.poll)
+            if args.status_port:
+                watcher.serve_status(args.status_port)
+            try:
+                watcher.run()
+            finally:
+                ingestion.close()
+            return
+        
         if args.file:
             # Process single file
             filepath = Path(args.file)
@@ -183,6 +313,9 @@ def main():
                 incremental=args.incremental or not args.full
             )
         
+        if args.category_indexes:
+            ingestion.create_category_indexes(min_chunks=args.category_index_min_chunks)
+        
         ingestion.close()
         logger.info("Ingestion complete!")
         
@@ -5,23 +5,45 @@ Extracts text from PDF files and chunks them for embedding
 
 import PyPDF2
 import pdfplumber
-from typing import List, Dict, Tuple
+from contextlib import contextmanager
+from typing import List, Dict, Iterator, Tuple
 import hashlib
 import os
+import signal
+import threading
+import time
+import unicodedata
 from datetime import datetime
 
 
+# Fast-extractor output is considered garbled above/below these ratios
+GARBLED_MAX_RATIO = 0.05
+MIN_TEXT_RATIO = 0.7
+MAX_AVG_WORD_LENGTH = 25
+
+
+class ExtractionTimeout(Exception):
+    """A page or document exceeded its extraction time budget"""
+
+
 class PDFProcessor:
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50,
+                 page_timeout_s: float = None, doc_timeout_s: float = None):
         """
         Initialize PDF processor
         
         Args:
             chunk_size: Number of characters per chunk
             chunk_overlap: Number of overlapping characters between chunks
+            page_timeout_s: Extraction budget per page (0 for none)
+            doc_timeout_s: Extraction budget per document (0 for none)
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.page_timeout_s = (page_timeout_s if page_timeout_s is not None
+                               else float(os.getenv("PDF_PAGE_TIMEOUT", 10)))
+        self.doc_timeout_s = (doc_timeout_s if doc_timeout_s is not None
+                              else float(os.getenv("PDF_DOC_TIMEOUT", 120)))
     
     def calculate_file_hash(self, filepath: str) -> str:
         """Calculate SHA-256 hash of file for tracking changes"""
@@ -31,6 +53,168 @@ class PDFProcessor:
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
     
+    def _looks_broken(self, text: str) -> bool:
+        """
+        Heuristic for fast-extractor output that needs the layout-aware fallback:
+        empty, unmapped glyphs ((cid:N), U+FFFD), mostly non-text characters,
+        or words run together because spaces were lost
+        """
+        text = text.strip() if text else ""
+        if not text:
+            return True
+        length = len(text)
+        if text.count("(cid:") * 6 / length > GARBLED_MAX_RATIO:
+            return True
+        if text.count("\ufffd") / length > GARBLED_MAX_RATIO:
+            return True
+        # Letters, combining marks (Indic vowel signs), numbers, punctuation, separators
+        texty = sum(1 for c in text if c.isspace() or unicodedata.category(c)[0] in "LMNPZ")
+        if texty / length < MIN_TEXT_RATIO:
+            return True
+        words = text.split()
+        return sum(len(w) for w in words) / len(words) > MAX_AVG_WORD_LENGTH
+
+    @contextmanager
+    def _time_limit(self, seconds: float):
+        """
+        Raise ExtractionTimeout if the block runs longer than seconds
+
+        Uses SIGALRM, so it is only enforced in the main thread on Unix;
+        elsewhere budgets are checked between pages only.
+        """
+        if (seconds is None or not hasattr(signal, "setitimer")
+                or threading.current_thread() is not threading.main_thread()):
+            yield
+            return
+
+        expired = []
+
+        def on_alarm(signum, frame):
+            expired.append(True)
+            raise ExtractionTimeout(f"exceeded {seconds:.1f}s")
+
+        previous = signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, max(seconds, 0.001))
+        try:
+            yield
+        except ExtractionTimeout:
+            raise
+        except Exception as e:
+            # pdfminer re-raises exceptions from deep in the parser as its own types
+            if expired:
+                raise ExtractionTimeout(f"exceeded {seconds:.1f}s") from e
+            raise
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    def iter_pages(self, filepath: str, stats: Dict = None) -> Iterator[Dict]:
+        """
+        Extract text page by page, yielding pages as they are extracted
+
+        PyPDF2 is tried first on each page; pdfplumber's slower layout analysis
+        runs only for pages whose fast output looks broken. Each page gets
+        page_timeout_s across both extractors and the whole document
+        doc_timeout_s; a page that runs out of time without text is lost, and
+        pages after the document budget is spent are not extracted.
+
+        Args:
+            filepath: Path to PDF file
+            stats: Optional dict filled with per-extractor page counts,
+                timed_out (extractor attempts cut short), lost (pages left
+                without text by a timeout) and truncated
+
+        Yields:
+            Dicts with page_number, text and extractor
+        """
+        if stats is None:
+            stats = {}
+        stats.update({'fast': 0, 'fallback': 0, 'empty': 0, 'timed_out': 0, 'lost': 0, 'truncated': False})
+        deadline = time.monotonic() + self.doc_timeout_s if self.doc_timeout_s else None
+        plumber = None
+        plumber_failed = False
+
+        def budget(page_deadline):
+            # Seconds left for this page; None means no limit (both budgets disabled with 0)
+            deadlines = [d for d in (page_deadline, deadline) if d is not None]
+            return min(deadlines) - time.monotonic() if deadlines else None
+
+        try:
+            try:
+                reader = PyPDF2.PdfReader(filepath)
+                page_count = len(reader.pages)
+            except Exception as e:
+                print(f"PyPDF2 could not open {os.path.basename(filepath)}, using pdfplumber: {e}")
+                reader = None
+                plumber = pdfplumber.open(filepath)
+                page_count = len(plumber.pages)
+
+            for index in range(page_count):
+                if deadline is not None and time.monotonic() >= deadline:
+                    print(f"Document time budget spent after {index} of {page_count} pages: {filepath}")
+                    stats['truncated'] = True
+                    break
+
+                text, extractor = "", None
+                timed_out = False
+                page_deadline = time.monotonic() + self.page_timeout_s if self.page_timeout_s else None
+                if reader is not None:
+                    try:
+                        with self._time_limit(budget(page_deadline)):
+                            text = reader.pages[index].extract_text() or ""
+                        extractor = 'fast'
+                    except ExtractionTimeout:
+                        stats['timed_out'] += 1
+                        timed_out = True
+                        # An interrupted parse can leave the reader's object cache half-built
+                        reader = PyPDF2.PdfReader(filepath)
+                    except Exception as e:
+                        print(f"PyPDF2 failed on page {index + 1} of {os.path.basename(filepath)}: {e}")
+
+                try:
+                    remaining = budget(page_deadline)
+                    if remaining is not None and remaining <= 0:
+                        # The fast extractor used up the page's budget
+                        timed_out = timed_out or self._looks_broken(text)
+                    elif self._looks_broken(text) and not plumber_failed:
+                        if plumber is None:
+                            try:
+                                plumber = pdfplumber.open(filepath)
+                            except Exception:
+                                plumber_failed = True
+                                raise
+                        with self._time_limit(budget(page_deadline)):
+                            page = plumber.pages[index]
+                            fallback = page.extract_text() or ""
+                            page.flush_cache()
+                        # Keep the fast text if the fallback found nothing better
+                        if fallback.strip() and (not text.strip() or not self._looks_broken(fallback)):
+                            text, extractor = fallback, 'fallback'
+                except ExtractionTimeout:
+                    print(f"Page {index + 1} of {os.path.basename(filepath)} timed out")
+                    stats['timed_out'] += 1
+                    timed_out = True
+                    # Reopen for later pages rather than reuse interrupted parser state
+                    if plumber is not None:
+                        plumber.close()
+                        plumber = None
+                except Exception as e:
+                    print(f"pdfplumber failed on page {index + 1} of {os.path.basename(filepath)}: {e}")
+
+                text = text.strip()
+                if not text:
+                    stats['lost' if timed_out else 'empty'] += 1
+                    continue
+                stats[extractor] += 1
+                yield {
+                    'page_number': index + 1,
+                    'text': text,
+                    'extractor': extractor
+                }
+        finally:
+            if plumber is not None:
+                plumber.close()
+
     def extract_text_from_pdf(self, filepath: str) -> List[Dict]:
         """
         Extract text from PDF file page by page
@@ -38,37 +222,7 @@ class PDFProcessor:
         Returns:
             List of dicts with page_number and text
         """
-        pages = []
-        
-        try:
-            # Try pdfplumber first (better text extraction)
-            with pdfplumber.open(filepath) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    text = page.extract_text()
-                    if text and text.strip():
-                        pages.append({
-                            'page_number': page_num,
-                            'text': text.strip()
-                        })
-        except Exception as e:
-            print(f"pdfplumber failed, trying PyPDF2: {e}")
-            # Fallback to PyPDF2
-            try:
-                with open(filepath, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for page_num in range(len(pdf_reader.pages)):
-                        page = pdf_reader.pages[page_num]
-                        text = page.extract_text()
-                        if text and text.strip():
-                            pages.append({
-                                'page_number': page_num + 1,
-                                'text': text.strip()
-                            })
-            except Exception as e2:
-                print(f"PyPDF2 also failed: {e2}")
-                raise
-        
-        return pages
+        return list(self.iter_pages(filepath))
     
     def chunk_text(self, text: str, page_number: int) -> List[Dict]:
         """
@@ -113,24 +267,28 @@ class PDFProcessor:
         
         return chunks
     
-    def process_pdf(self, filepath: str) -> Tuple[Dict, List[Dict]]:
+    def process_pdf(self, filepath: str, filename: str = None) -> Tuple[Dict, List[Dict]]:
         """
         Process a PDF file: extract text and create chunks
         
+        Args:
+            filepath: Path to PDF file
+            filename: Name the document is stored under (default: the base name)
+        
         Returns:
             Tuple of (document_metadata, chunks)
         """
-        filename = os.path.basename(filepath)
+        filename = filename or os.path.basename(filepath)
         file_hash = self.calculate_file_hash(filepath)
         file_size = os.path.getsize(filepath)
         last_modified = datetime.fromtimestamp(os.path.getmtime(filepath))
         
-        # Extract text from all pages
-        pages = self.extract_text_from_pdf(filepath)
-        
-        # Create chunks from all pages
+        # Chunk pages as they are extracted
+        extraction = {}
         all_chunks = []
-        for page_data in pages:
+        total_pages = 0
+        for page_data in self.iter_pages(filepath, stats=extraction):
+            total_pages += 1
             page_chunks = self.chunk_text(page_data['text'], page_data['page_number'])
             all_chunks.extend(page_chunks)
         
@@ -139,9 +297,15 @@ class PDFProcessor:
             'file_hash': file_hash,
             'file_size': file_size,
             'last_modified': last_modified,
-            'total_pages': len(pages),
-            'chunk_count': len(all_chunks)
+            'total_pages': total_pages,
+            'chunk_count': len(all_chunks),
+            # Stored in documents.metadata
+            'metadata': {'extraction': extraction},
+            # Pages were lost to the time budgets; stored, but not marked complete
+            'partial': bool(extraction.get('lost') or extraction.get('truncated'))
         }
+        if extraction.get('fallback') or extraction.get('timed_out') or document_metadata['partial']:
+            print(f"Extraction of {filename}: {extraction}")
         
         return document_metadata, all_chunks
 
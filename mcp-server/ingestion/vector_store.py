@@ -4,18 +4,51 @@ Handles PostgreSQL operations with pgvector for document storage and retrieval
 """
 
 import psycopg2
+import psycopg2.pool
 from psycopg2.extras import execute_values, RealDictCursor
 from typing import List, Dict, Optional, Tuple
+from contextlib import contextmanager
+import hashlib
 import json
+import re
+import threading
 from datetime import datetime
 import os
 
 
+# Filters accepted by similarity_search; document-level keys are applied via
+# a semi-join on documents, chunk-level keys directly on document_chunks
+FILTER_KEYS = {
+    'document_ids', 'filenames', 'category', 'created_after', 'created_before',
+    'page_min', 'page_max', 'metadata'
+}
+
+# Columns and indexes added after init-db.sql first shipped. init-db.sql only runs
+# on an empty volume, so existing databases are upgraded by ensure_schema().
+SCHEMA_COLUMNS = [
+    ('documents', 'category', "ALTER TABLE documents ADD COLUMN IF NOT EXISTS category VARCHAR(100)"),
+    ('documents', 'metadata', "ALTER TABLE documents ADD COLUMN IF NOT EXISTS metadata JSONB DEFAULT '{}'"),
+    ('document_chunks', 'category', "ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS category VARCHAR(100)"),
+    ('processed_files', 'complete', "ALTER TABLE processed_files ADD COLUMN IF NOT EXISTS complete BOOLEAN DEFAULT TRUE"),
+    ('processed_files', 'attempts', "ALTER TABLE processed_files ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 1"),
+]
+SCHEMA_INDEXES = [
+    ('idx_chunks_category', "CREATE INDEX IF NOT EXISTS idx_chunks_category ON document_chunks(category)"),
+    ('idx_documents_created', "CREATE INDEX IF NOT EXISTS idx_documents_created ON documents(created_at)"),
+    ('idx_documents_metadata', "CREATE INDEX IF NOT EXISTS idx_documents_metadata ON documents USING gin (metadata)"),
+]
+
+
 class VectorStore:
     def __init__(self, host: str = None, port: int = None, 
-                 database: str = None, user: str = None, password: str = None):
+                 database: str = None, user: str = None, password: str = None,
+                 pool_size: int = None):
         """
         Initialize connection to PostgreSQL with pgvector
+
+        Args:
+            pool_size: If set, searches use a per-process pool of this many
+                connections instead of the single shared connection
         """
         self.conn_params = {
             'host': host or os.getenv("POSTGRES_HOST", "postgres"),
@@ -25,6 +58,19 @@ class VectorStore:
             'password': password or os.getenv("POSTGRES_PASSWORD", "admin")
         }
         self.conn = None
+        self.pool_size = pool_size
+        self._pool = None
+        self._pool_pid = None
+        self._pool_slots = None
+        self._pool_lock = threading.Lock()
+        # Filtered searches whose candidate set is at most this many chunks are
+        # answered exactly (no ANN index), so small filtered sets never lose recall
+        self.exact_search_threshold = int(os.getenv("VECTOR_EXACT_SEARCH_THRESHOLD", 20000))
+        self.filtered_probes = int(os.getenv("VECTOR_FILTERED_PROBES", 20))
+        # Extractions of an unchanged file that lost pages to the time budgets
+        # are retried until this many attempts, then kept as they are
+        self.max_partial_attempts = int(os.getenv("INGEST_PARTIAL_ATTEMPTS", 3))
+        self._schema_checked = False
         self.connect()
     
     def connect(self):
@@ -36,28 +82,116 @@ class VectorStore:
         except Exception as e:
             print(f"Error connecting to database: {e}")
             raise
+        if not self._schema_checked:
+            self.ensure_schema()
+    
+    def ensure_schema(self):
+        """
+        Add columns and indexes missing from databases created by an older init-db.sql
+        
+        Catalog lookups come first, so an up-to-date database takes no table locks.
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT table_name, column_name FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name IN ('documents', 'document_chunks', 'processed_files')
+                    """
+                )
+                columns = set(cur.fetchall())
+                cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+                indexes = {row[0] for row in cur.fetchall()}
+
+                if not columns:
+                    # Tables not created yet (init-db.sql has not run); nothing to upgrade
+                    self.conn.rollback()
+                    return
+                statements = [sql for table, column, sql in SCHEMA_COLUMNS if (table, column) not in columns]
+                statements += [sql for name, sql in SCHEMA_INDEXES if name not in indexes]
+                for sql in statements:
+                    print(f"Upgrading schema: {sql}")
+                    cur.execute(sql)
+            self.conn.commit()
+            self._schema_checked = True
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Error upgrading schema: {e}")
+            raise
     
     def close(self):
         """Close database connection"""
         if self.conn:
             self.conn.close()
             print("Database connection closed")
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+            self._pool_pid = None
+
+    def ensure_connection(self):
+        """Reconnect if the connection was closed (e.g. released before a fork)"""
+        if self.conn is None or self.conn.closed:
+            self.connect()
+
+    def _get_pool(self):
+        # Created lazily per process so forked workers never share sockets
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = psycopg2.pool.ThreadedConnectionPool(1, self.pool_size, **self.conn_params)
+                self._pool_pid = os.getpid()
+                self._pool_slots = threading.BoundedSemaphore(self.pool_size)
+            return self._pool
+
+    @contextmanager
+    def read_connection(self):
+        """Connection for read-only queries: pooled when pool_size is set, else the shared one"""
+        if not self.pool_size:
+            self.ensure_connection()
+            yield self.conn
+            return
+
+        pool = self._get_pool()
+        self._pool_slots.acquire()
+        try:
+            conn = pool.getconn()
+            try:
+                yield conn
+            finally:
+                if not conn.closed:
+                    conn.rollback()
+                pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._pool_slots.release()
     
-    def is_file_processed(self, file_hash: str) -> bool:
+    def is_file_processed(self, file_hash: str, filename: str = None) -> bool:
         """
         Check if a file has already been processed
         
         Args:
             file_hash: SHA-256 hash of the file
+            filename: If given, only a record for this filename counts, so an
+                identical copy stored under another path is still ingested
             
         Returns:
-            True if file exists in processed_files table
+            True if file exists in processed_files table and was fully
+            extracted, or its partial extraction was already attempted
+            max_partial_attempts times
         """
         with self.conn.cursor() as cur:
-            cur.execute(
-                "SELECT COUNT(*) FROM processed_files WHERE file_hash = %s",
-                (file_hash,)
-            )
+            if filename is not None:
+                cur.execute(
+                    "SELECT COUNT(*) FROM processed_files WHERE file_hash = %s AND filename = %s "
+                    "AND (complete OR attempts >= %s)",
+                    (file_hash, filename, self.max_partial_attempts)
+                )
+            else:
+                cur.execute(
+                    "SELECT COUNT(*) FROM processed_files WHERE file_hash = %s "
+                    "AND (complete OR attempts >= %s)",
+                    (file_hash, self.max_partial_attempts)
+                )
             count = cur.fetchone()[0]
             return count > 0
     
@@ -71,16 +205,23 @@ class VectorStore:
         with self.conn.cursor() as cur:
             cur.execute(
                 """
-                INSERT INTO documents (filename, file_hash, total_pages)
-                VALUES (%s, %s, %s)
+                INSERT INTO documents (filename, file_hash, total_pages, category, metadata)
+                VALUES (%s, %s, %s, %s, %s)
                 RETURNING id
                 """,
-                (doc_metadata['filename'], doc_metadata['file_hash'], doc_metadata['total_pages'])
+                (
+                    doc_metadata['filename'],
+                    doc_metadata['file_hash'],
+                    doc_metadata['total_pages'],
+                    doc_metadata.get('category'),
+                    json.dumps(doc_metadata.get('metadata') or {})
+                )
             )
             document_id = cur.fetchone()[0]
             return document_id
     
-    def insert_chunks(self, document_id: int, chunks: List[Dict], embeddings: List[List[float]]):
+    def insert_chunks(self, document_id: int, chunks: List[Dict], embeddings: List[List[float]],
+                      category: str = None):
         """
         Insert document chunks with their embeddings
         
@@ -88,6 +229,7 @@ class VectorStore:
             document_id: ID of the parent document
             chunks: List of chunk dictionaries
             embeddings: List of embedding vectors
+            category: Document category, copied onto each chunk for filtering
         """
         data = [
             (
@@ -96,7 +238,8 @@ class VectorStore:
                 chunk['chunk_index'],
                 chunk['content'],
                 json.dumps(chunk),  # Store full chunk metadata as JSONB
-                embeddings[i]
+                embeddings[i],
+                category
             )
             for i, chunk in enumerate(chunks)
         ]
@@ -106,40 +249,49 @@ class VectorStore:
                 cur,
                 """
                 INSERT INTO document_chunks 
-                (document_id, page_number, chunk_index, content, metadata, embedding)
+                (document_id, page_number, chunk_index, content, metadata, embedding, category)
                 VALUES %s
                 """,
                 data,
-                template="(%s, %s, %s, %s, %s, %s::vector)"
+                template="(%s, %s, %s, %s, %s, %s::vector, %s)"
             )
     
     def mark_file_processed(self, doc_metadata: Dict):
         """
         Mark file as processed in tracking table
+        
+        Documents with pages lost to extraction budgets (doc_metadata['partial'])
+        are recorded as incomplete, so later runs extract them again; attempts
+        counts the extractions of the same file_hash.
         """
         with self.conn.cursor() as cur:
             cur.execute(
                 """
                 INSERT INTO processed_files 
-                (filename, file_hash, file_size, last_modified, chunk_count)
-                VALUES (%s, %s, %s, %s, %s)
+                (filename, file_hash, file_size, last_modified, chunk_count, complete, attempts)
+                VALUES (%s, %s, %s, %s, %s, %s, 1)
                 ON CONFLICT (filename) DO UPDATE
                 SET file_hash = EXCLUDED.file_hash,
                     file_size = EXCLUDED.file_size,
                     last_modified = EXCLUDED.last_modified,
                     processed_at = NOW(),
-                    chunk_count = EXCLUDED.chunk_count
+                    chunk_count = EXCLUDED.chunk_count,
+                    complete = EXCLUDED.complete,
+                    attempts = CASE WHEN processed_files.file_hash = EXCLUDED.file_hash
+                                    THEN processed_files.attempts + 1 ELSE 1 END
                 """,
                 (
                     doc_metadata['filename'],
                     doc_metadata['file_hash'],
                     doc_metadata['file_size'],
                     doc_metadata['last_modified'],
-                    doc_metadata['chunk_count']
+                    doc_metadata['chunk_count'],
+                    not doc_metadata.get('partial', False)
                 )
             )
     
-    def store_document(self, doc_metadata: Dict, chunks: List[Dict], embeddings: List[List[float]]):
+    def store_document(self, doc_metadata: Dict, chunks: List[Dict], embeddings: List[List[float]],
+                       replace: bool = False):
         """
         Store complete document with chunks and embeddings
         
@@ -147,19 +299,27 @@ class VectorStore:
             doc_metadata: Document metadata
             chunks: List of text chunks
             embeddings: List of embedding vectors
+            replace: Delete earlier versions of the same filename in the same
+                transaction, so searches never see both or neither
         """
         try:
             # Check if already processed
-            if self.is_file_processed(doc_metadata['file_hash']):
+            if self.is_file_processed(doc_metadata['file_hash'], doc_metadata['filename']):
                 print(f"File {doc_metadata['filename']} already processed (hash: {doc_metadata['file_hash'][:8]}...)")
                 return False
             
+            if replace:
+                with self.conn.cursor() as cur:
+                    cur.execute("DELETE FROM documents WHERE filename = %s", (doc_metadata['filename'],))
+                    if cur.rowcount:
+                        print(f"Replaced {cur.rowcount} earlier version(s) of {doc_metadata['filename']}")
+            
             # Insert document
             document_id = self.insert_document(doc_metadata)
             print(f"Inserted document {document_id}: {doc_metadata['filename']}")
             
             # Insert chunks with embeddings
-            self.insert_chunks(document_id, chunks, embeddings)
+            self.insert_chunks(document_id, chunks, embeddings, category=doc_metadata.get('category'))
             print(f"Inserted {len(chunks)} chunks")
             
             # Mark as processed
@@ -175,37 +335,328 @@ class VectorStore:
             print(f"Error storing document: {e}")
             raise
     
-    def similarity_search(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+    def delete_document(self, filename: str) -> int:
+        """
+        Delete all versions of a document, its chunks and its processed_files entry
+        
+        Returns:
+            Number of documents deleted
+        """
+        self.ensure_connection()
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM documents WHERE filename = %s", (filename,))
+                deleted = cur.rowcount
+                cur.execute("DELETE FROM processed_files WHERE filename = %s", (filename,))
+            self.conn.commit()
+            return deleted
+        except Exception:
+            self.conn.rollback()
+            raise
+    
+    def find_stale_documents(self) -> Dict[str, List[int]]:
+        """
+        Find documents that no longer back a current file
+        
+        Returns:
+            Dict with ids of superseded documents (an older hash of a file that
+            has since changed), duplicates (older copies of the current version)
+            and orphaned documents (no processed_files entry, or no chunks)
+        """
+        self.ensure_connection()
+        queries = {
+            'superseded': """
+                SELECT d.id FROM documents d
+                JOIN processed_files p ON p.filename = d.filename
+                WHERE p.file_hash IS DISTINCT FROM d.file_hash
+            """,
+            'duplicates': """
+                SELECT d.id FROM documents d
+                JOIN processed_files p ON p.filename = d.filename AND p.file_hash = d.file_hash
+                WHERE EXISTS (
+                    SELECT 1 FROM documents newer
+                    WHERE newer.filename = d.filename AND newer.file_hash = d.file_hash AND newer.id > d.id
+                )
+            """,
+            'orphaned': """
+                SELECT d.id FROM documents d
+                WHERE NOT EXISTS (SELECT 1 FROM processed_files p WHERE p.filename = d.filename)
+                   OR NOT EXISTS (SELECT 1 FROM document_chunks dc WHERE dc.document_id = d.id)
+            """,
+        }
+        stale = {}
+        with self.conn.cursor() as cur:
+            for kind, sql in queries.items():
+                cur.execute(sql + " ORDER BY 1")
+                stale[kind] = [row[0] for row in cur.fetchall()]
+        self.conn.rollback()
+        return stale
+    
+    def delete_documents(self, document_ids: List[int], batch_size: int = 500) -> Tuple[int, int]:
+        """
+        Delete documents (and, by cascade, their chunks) in batches, committing
+        after each batch so locks and WAL stay small
+        
+        Returns:
+            Tuple of (documents deleted, chunks deleted)
+        """
+        self.ensure_connection()
+        documents = chunks = 0
+        for start in range(0, len(document_ids), batch_size):
+            batch = document_ids[start:start + batch_size]
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute("DELETE FROM document_chunks WHERE document_id = ANY(%s)", (batch,))
+                    chunks += cur.rowcount
+                    cur.execute("DELETE FROM documents WHERE id = ANY(%s)", (batch,))
+                    documents += cur.rowcount
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        return documents, chunks
+    
+    def processed_filenames(self) -> List[str]:
+        """Filenames recorded in processed_files"""
+        self.ensure_connection()
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT filename FROM processed_files")
+            rows = [row[0] for row in cur.fetchall()]
+        self.conn.rollback()
+        return rows
+    
+    def _filter_clause(self, filters: Optional[Dict]) -> Tuple[str, list]:
+        """
+        Build a WHERE clause over document_chunks (alias dc) from search filters
+        
+        Args:
+            filters: Dict with any of document_ids, filenames, category (str or list),
+                created_after, created_before, page_min, page_max, metadata (JSONB containment)
+            
+        Returns:
+            Tuple of (SQL condition or empty string, parameters)
+        """
+        if not filters:
+            return "", []
+
+        unknown = set(filters) - FILTER_KEYS
+        if unknown:
+            raise ValueError(f"Unknown search filters: {', '.join(sorted(unknown))}")
+
+        chunk_conds, doc_conds, chunk_params, doc_params = [], [], [], []
+
+        if filters.get('document_ids'):
+            chunk_conds.append("dc.document_id = ANY(%s)")
+            chunk_params.append([int(i) for i in filters['document_ids']])
+        category = filters.get('category')
+        if category:
+            # A single literal category lets the planner pick a partial ANN index
+            if isinstance(category, str):
+                chunk_conds.append("dc.category = %s")
+                chunk_params.append(category)
+            else:
+                chunk_conds.append("dc.category = ANY(%s)")
+                chunk_params.append(list(category))
+        if filters.get('page_min') is not None:
+            chunk_conds.append("dc.page_number >= %s")
+            chunk_params.append(int(filters['page_min']))
+        if filters.get('page_max') is not None:
+            chunk_conds.append("dc.page_number <= %s")
+            chunk_params.append(int(filters['page_max']))
+
+        if filters.get('filenames'):
+            doc_conds.append("d.filename = ANY(%s)")
+            doc_params.append(list(filters['filenames']))
+        if filters.get('created_after'):
+            doc_conds.append("d.created_at >= %s")
+            doc_params.append(filters['created_after'])
+        if filters.get('created_before'):
+            doc_conds.append("d.created_at < %s")
+            doc_params.append(filters['created_before'])
+        if filters.get('metadata'):
+            doc_conds.append("d.metadata @> %s::jsonb")
+            doc_params.append(json.dumps(filters['metadata']))
+
+        if doc_conds:
+            chunk_conds.append(
+                "dc.document_id IN (SELECT d.id FROM documents d WHERE " + " AND ".join(doc_conds) + ")"
+            )
+        return " AND ".join(chunk_conds), chunk_params + doc_params
+
+    def _prepare_filtered_search(self, cur, where: str, params: list):
+        """
+        Choose the search strategy for a filtered query within the current transaction
+
+        Small candidate sets are scanned exactly (ANN index disabled) so recall is
+        100%; larger ones use the ANN index with more probes.
+        """
+        cur.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM document_chunks dc WHERE {where} LIMIT %s) candidates",
+            params + [self.exact_search_threshold + 1]
+        )
+        candidates = cur.fetchone()['count']
+        if candidates <= self.exact_search_threshold:
+            cur.execute("SET LOCAL enable_indexscan = off")
+            return "exact"
+        cur.execute("SET LOCAL ivfflat.probes = %s", (self.filtered_probes,))
+        return "ann"
+
+    def _search(self, cur, query_embedding: List[float], top_k: int, where: str, params: list) -> List[Dict]:
+        # Rank chunks first and join documents only for the top_k rows
+        cur.execute(
+            f"""
+            SELECT 
+                r.content,
+                r.page_number,
+                r.chunk_index,
+                r.metadata,
+                d.filename,
+                1 - r.distance as similarity
+            FROM (
+                SELECT dc.document_id, dc.content, dc.page_number, dc.chunk_index, dc.metadata,
+                       dc.embedding <=> %s::vector as distance
+                FROM document_chunks dc
+                {"WHERE " + where if where else ""}
+                ORDER BY dc.embedding <=> %s::vector
+                LIMIT %s
+            ) r
+            JOIN documents d ON r.document_id = d.id
+            ORDER BY r.distance
+            """,
+            [query_embedding] + params + [query_embedding, top_k]
+        )
+        return [dict(row) for row in cur.fetchall()]
+
+    def similarity_search(self, query_embedding: List[float], top_k: int = 5,
+                          filters: Optional[Dict] = None) -> List[Dict]:
         """
         Search for similar document chunks using cosine similarity
         
         Args:
             query_embedding: Query vector
             top_k: Number of results to return
+            filters: Optional metadata filters (see _filter_clause)
             
         Returns:
             List of matching chunks with metadata
         """
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                """
-                SELECT 
-                    dc.content,
-                    dc.page_number,
-                    dc.chunk_index,
-                    dc.metadata,
-                    d.filename,
-                    1 - (dc.embedding <=> %s::vector) as similarity
+        where, params = self._filter_clause(filters)
+        with self.read_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            try:
+                strategy = self._prepare_filtered_search(cur, where, params) if where else None
+                results = self._search(cur, query_embedding, top_k, where, params)
+                if strategy == "ann" and len(results) < top_k:
+                    # The ANN probes held too few matching rows; fall back to an exact scan
+                    cur.execute("SET LOCAL enable_indexscan = off")
+                    results = self._search(cur, query_embedding, top_k, where, params)
+                return results
+            finally:
+                # SET LOCAL only lasts until the end of this transaction
+                conn.rollback()
+
+    def similarity_search_batch(self, query_embeddings: List[List[float]], top_k: int = 5,
+                                filters: Optional[Dict] = None) -> List[List[Dict]]:
+        """
+        Search for several query vectors in a single round trip
+        
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of results per query
+            filters: Optional metadata filters applied to every query
+            
+        Returns:
+            One list of matching chunks per query, in input order
+        """
+        if not query_embeddings:
+            return []
+
+        where, params = self._filter_clause(filters)
+        # pgvector text format; text[] is cast to vector[] server-side
+        vectors = ["[" + ",".join(repr(float(v)) for v in emb) + "]" for emb in query_embeddings]
+
+        with self.read_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            try:
+                strategy = self._prepare_filtered_search(cur, where, params) if where else None
+                grouped = self._search_batch(cur, vectors, top_k, where, params)
+                short = [i for i, results in enumerate(grouped) if len(results) < top_k]
+                if strategy == "ann" and short:
+                    # As in similarity_search: re-run queries the ANN probes starved with an exact scan
+                    cur.execute("SET LOCAL enable_indexscan = off")
+                    retried = self._search_batch(cur, [vectors[i] for i in short], top_k, where, params)
+                    for i, results in zip(short, retried):
+                        grouped[i] = results
+            finally:
+                conn.rollback()
+        return grouped
+
+    def _search_batch(self, cur, vectors: List[str], top_k: int, where: str, params: list) -> List[List[Dict]]:
+        grouped = [[] for _ in vectors]
+        cur.execute(
+            f"""
+            SELECT q.query_index, r.content, r.page_number, r.chunk_index, r.metadata,
+                   d.filename, 1 - r.distance as similarity
+            FROM unnest(%s::vector[]) WITH ORDINALITY AS q(embedding, query_index)
+            CROSS JOIN LATERAL (
+                SELECT dc.document_id, dc.content, dc.page_number, dc.chunk_index, dc.metadata,
+                       dc.embedding <=> q.embedding as distance
                 FROM document_chunks dc
-                JOIN documents d ON dc.document_id = d.id
-                ORDER BY dc.embedding <=> %s::vector
+                {"WHERE " + where if where else ""}
+                ORDER BY dc.embedding <=> q.embedding
                 LIMIT %s
+            ) r
+            JOIN documents d ON r.document_id = d.id
+            ORDER BY q.query_index, r.distance
+            """,
+            [vectors] + params + [top_k]
+        )
+        for row in cur.fetchall():
+            row = dict(row)
+            grouped[row.pop('query_index') - 1].append(row)
+        return grouped
+
+    def create_category_index(self, category: str, lists: int = None) -> str:
+        """
+        Create a partial ANN index covering one category's chunks, so filtered
+        searches on that category get full ANN recall over just its rows
+        
+        Args:
+            category: Category value
+            lists: ivfflat lists (default: sqrt of the category's row count)
+            
+        Returns:
+            Index name
+        """
+        slug = re.sub(r'[^a-z0-9]+', '_', category.lower()).strip('_')[:28] or 'uncategorized'
+        # The slug is lossy ("Soil Health" and "soil-health" share one); the hash of the
+        # raw value keeps each category's index separate within the 63-byte name limit
+        digest = hashlib.sha1(category.encode('utf-8')).hexdigest()[:8]
+        index_name = f"idx_chunks_embedding_cat_{slug}_{digest}"
+        self.ensure_connection()
+        with self.conn.cursor() as cur:
+            if lists is None:
+                cur.execute("SELECT count(*) FROM document_chunks WHERE category = %s", (category,))
+                lists = max(1, int(cur.fetchone()[0] ** 0.5))
+            cur.execute(
+                f"""
+                CREATE INDEX IF NOT EXISTS {index_name} ON document_chunks
+                USING ivfflat (embedding vector_cosine_ops) WITH (lists = %s)
+                WHERE category = %s
                 """,
-                (query_embedding, query_embedding, top_k)
+                (lists, category)
             )
-            results = cur.fetchall()
-            return [dict(row) for row in results]
+        self.conn.commit()
+        return index_name
 
+    def list_categories(self) -> List[Tuple[str, int]]:
+        """Return (category, chunk count) pairs"""
+        self.ensure_connection()
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT category, count(*) FROM document_chunks WHERE category IS NOT NULL GROUP BY category ORDER BY 2 DESC"
+            )
+            rows = cur.fetchall()
+        self.conn.rollback()
+        return rows
 
 if __name__ == "__main__":
     # Test vector store
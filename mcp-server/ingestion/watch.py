@@ -0,0 +1,357 @@
+"""
+Watch-Mode Ingestion
+Long-running daemon that keeps the embedding model and database connection
+warm and ingests PDFs as they are added, changed or deleted under the data
+directory. Uses inotify (via watchdog) when available, polling otherwise.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+logger = logging.getLogger(__name__)
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog events for PDFs to the watcher queue"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.enqueue(Path(event.src_path), UPSERT)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.enqueue(Path(event.src_path), UPSERT)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.watcher.enqueue(Path(event.src_path), DELETE)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.enqueue(Path(event.src_path), DELETE)
+            self.watcher.enqueue(Path(event.dest_path), UPSERT)
+
+
+class IngestionWatcher:
+    def __init__(self, ingestion, debounce_s: float = None, batch_size: int = None,
+                 poll_interval_s: float = None, rescan_interval_s: float = None,
+                 max_duty: float = None, max_load: float = None, use_inotify: bool = True,
+                 retry_base_s: float = None, retry_max_s: float = None):
+        """
+        Initialize watcher
+
+        Args:
+            ingestion: DocumentIngestion whose model and connection stay loaded
+            debounce_s: Quiet period after the last event before a file is ingested
+            batch_size: Files ingested per batch
+            poll_interval_s: Scan interval when polling
+            rescan_interval_s: Full rescan interval as a safety net under inotify
+            max_duty: Fraction of wall time spent ingesting; the rest is slept
+            max_load: Defer batches while the 1-minute load average per CPU is above this
+            use_inotify: Use inotify when watchdog is installed
+            retry_base_s: First retry delay for a file that failed; doubles per attempt
+            retry_max_s: Longest retry delay
+        """
+        self.ingestion = ingestion
+        self.data_dir = ingestion.data_dir
+        self.debounce_s = debounce_s if debounce_s is not None else float(os.getenv("WATCH_DEBOUNCE", 2))
+        self.batch_size = batch_size or int(os.getenv("WATCH_BATCH_SIZE", 8))
+        self.poll_interval_s = poll_interval_s or float(os.getenv("WATCH_POLL_INTERVAL", 2))
+        self.rescan_interval_s = rescan_interval_s or float(os.getenv("WATCH_RESCAN_INTERVAL", 300))
+        self.max_duty = max_duty or float(os.getenv("WATCH_MAX_DUTY", 0.5))
+        self.max_load = max_load or float(os.getenv("WATCH_MAX_LOAD", 0.8))
+        self.backend = "inotify" if use_inotify and Observer is not None else "polling"
+        self.retry_base_s = retry_base_s or float(os.getenv("WATCH_RETRY_BASE", 5))
+        self.retry_max_s = retry_max_s or float(os.getenv("WATCH_RETRY_MAX", 300))
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # path -> {"action", "first_seen", "last_event", "stat", and after a failure
+        # "attempts", "not_before", "last_error"}
+        self._pending: Dict[Path, dict] = {}
+        self._snapshot: Dict[Path, tuple] = {}
+        self._observer = None
+        self._in_progress = []
+        self._counts = {"ingested": 0, "skipped": 0, "partial": 0, "deleted": 0, "errors": 0, "retries": 0, "batches": 0}
+        self._last_batch = None
+        self._throttled_s = 0.0
+        self._started_at = time.time()
+
+    def enqueue(self, path: Path, action: str):
+        """Record an event; repeated events for a path restart its debounce window"""
+        if path.suffix.lower() != ".pdf":
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._pending.get(path)
+            if entry is None:
+                entry = self._pending[path] = {"first_seen": now}
+            entry["action"] = action
+            entry["last_event"] = now
+            entry["stat"] = None
+            # A new event is a new reason to try; drop any retry backoff
+            entry.pop("not_before", None)
+            entry.pop("attempts", None)
+
+    def _retry(self, path: Path, entry: dict, error):
+        """Re-queue a failed path with exponential backoff (unless a newer event already did)"""
+        attempts = entry.get("attempts", 0) + 1
+        delay = min(self.retry_max_s, self.retry_base_s * 2 ** (attempts - 1))
+        logger.warning(f"Retrying {path} in {delay:.1f}s (attempt {attempts + 1}): {error}")
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending[path] = dict(entry, attempts=attempts, not_before=time.monotonic() + delay,
+                                       last_error=str(error))
+        self._counts["retries"] += 1
+
+    def _scan(self) -> Dict[Path, tuple]:
+        snapshot = {}
+        for path in self.data_dir.rglob("*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _diff_scan(self):
+        """Compare the directory against the last scan and enqueue differences"""
+        current = self._scan()
+        for path, signature in current.items():
+            if self._snapshot.get(path) != signature:
+                self.enqueue(path, UPSERT)
+        for path in set(self._snapshot) - set(current):
+            self.enqueue(path, DELETE)
+        self._snapshot = current
+
+    def reconcile(self):
+        """Enqueue every file on disk and delete documents whose file is gone"""
+        self._snapshot = self._scan()
+        for path in self._snapshot:
+            self.enqueue(path, UPSERT)
+        on_disk = {self.ingestion.document_name(path) for path in self._snapshot}
+        for filename in self.ingestion.vector_store.processed_filenames():
+            if filename not in on_disk:
+                self.enqueue(self.data_dir / filename, DELETE)
+
+    def _take_ready(self) -> list:
+        """Pop up to batch_size entries whose debounce window has passed and whose size is stable"""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, entry in sorted(self._pending.items(), key=lambda item: item[1]["first_seen"]):
+                if len(ready) >= self.batch_size:
+                    break
+                if now - entry["last_event"] < self.debounce_s or now < entry.get("not_before", 0):
+                    continue
+                if entry["action"] == UPSERT:
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        entry["action"] = DELETE
+                    else:
+                        signature = (stat.st_mtime_ns, stat.st_size)
+                        # Still being written: wait for two identical stats in a row
+                        if entry["stat"] != signature:
+                            entry["stat"] = signature
+                            entry["last_event"] = now
+                            continue
+                ready.append((path, entry))
+            for path, _ in ready:
+                del self._pending[path]
+        return ready
+
+    def _overloaded(self) -> bool:
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1) > self.max_load
+        except OSError:
+            return False
+
+    def _process(self, batch: list):
+        store = self.ingestion.vector_store
+        store.ensure_connection()
+        upserts = [path for path, entry in batch if entry["action"] == UPSERT]
+        deletes = [path for path, entry in batch if entry["action"] == DELETE]
+        entries = dict(batch)
+        self._in_progress = [str(path) for path, _ in batch]
+
+        for path in deletes:
+            name = self.ingestion.document_name(path)
+            try:
+                deleted = store.delete_document(name)
+                self._counts["deleted"] += deleted
+                logger.info(f"✓ Removed {name} ({deleted} document(s))")
+            except Exception as e:
+                logger.error(f"✗ Error removing {name}: {e}")
+                self._counts["errors"] += 1
+                self._retry(path, entries[path], e)
+
+        if upserts:
+            for path, outcome in self.ingestion.ingest_batch(upserts).items():
+                # A partial document would time out again; the next change to the file retries it
+                key = outcome if outcome in ("ingested", "partial", "skipped") else "errors"
+                self._counts[key] += 1
+                if key == "errors":
+                    # mtime and size are unchanged, so no scan would pick the file up again
+                    self._retry(path, entries[path], outcome)
+        # Don't sit idle in a transaction between batches (it would hold back VACUUM)
+        store.conn.rollback()
+
+        now = time.monotonic()
+        lags = [now - entry["first_seen"] for _, entry in batch]
+        self._last_batch = {
+            "files": len(batch),
+            "finished_at": time.time(),
+            "max_event_to_indexed_s": round(max(lags), 2),
+        }
+        self._counts["batches"] += 1
+        self._in_progress = []
+
+    def _reset_connection(self):
+        # ensure_connection() reconnects on the next batch
+        conn = self.ingestion.vector_store.conn
+        try:
+            if conn is not None and not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+
+    def status(self) -> dict:
+        """Queue and throughput counters for the status endpoint"""
+        now = time.monotonic()
+        with self._lock:
+            pending = sorted(self._pending.items(), key=lambda item: item[1]["first_seen"])
+            return {
+                "backend": self.backend,
+                "data_dir": str(self.data_dir),
+                "queue_depth": len(pending),
+                "queued": [
+                    {"path": str(path), "action": entry["action"],
+                     "waiting_s": round(now - entry["first_seen"], 2),
+                     "attempts": entry.get("attempts", 0),
+                     "retry_in_s": round(max(0.0, entry.get("not_before", 0) - now), 1),
+                     "last_error": entry.get("last_error")}
+                    for path, entry in pending[:50]
+                ],
+                "in_progress": list(self._in_progress),
+                "oldest_wait_s": round(now - pending[0][1]["first_seen"], 2) if pending else 0,
+                "counts": dict(self._counts),
+                "last_batch": self._last_batch,
+                "throttled_s": round(self._throttled_s, 2),
+                "uptime_s": round(time.time() - self._started_at, 1),
+            }
+
+    def serve_status(self, port: int):
+        """Serve status() as JSON on GET / in a background thread"""
+        watcher = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(watcher.status()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        threading.Thread(target=server.serve_forever, name="watch-status", daemon=True).start()
+        logger.info(f"Queue status on http://0.0.0.0:{port}/")
+        return server
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Watch until stop() is called or the process is interrupted"""
+        logger.info(f"Watching {self.data_dir} ({self.backend}, debounce {self.debounce_s}s, "
+                    f"batch {self.batch_size}, duty {self.max_duty:.0%})")
+        self.reconcile()
+
+        if self.backend == "inotify":
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), str(self.data_dir), recursive=True)
+            self._observer.start()
+        scan_interval = self.poll_interval_s if self.backend == "polling" else self.rescan_interval_s
+        next_scan = time.monotonic() + scan_interval
+
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_scan:
+                    self._diff_scan()
+                    next_scan = time.monotonic() + scan_interval
+
+                batch = self._take_ready()
+                if not batch:
+                    self._stop.wait(min(0.5, self.debounce_s or 0.5))
+                    continue
+
+                if self._overloaded():
+                    # Put the batch back and let the serving path have the CPU
+                    with self._lock:
+                        for path, entry in batch:
+                            self._pending.setdefault(path, entry)
+                    self._throttled_s += self.poll_interval_s
+                    self._stop.wait(self.poll_interval_s)
+                    continue
+
+                start = time.monotonic()
+                try:
+                    self._process(batch)
+                except Exception as e:
+                    # e.g. Postgres restarted: drop the connection, retry the batch later
+                    logger.error(f"✗ Batch failed: {e}")
+                    self._counts["errors"] += 1
+                    self._in_progress = []
+                    self._reset_connection()
+                    for path, entry in batch:
+                        self._retry(path, entry, e)
+                elapsed = time.monotonic() - start
+                # Keep ingestion to max_duty of wall time
+                pause = elapsed * (1 / self.max_duty - 1)
+                if pause > 0:
+                    self._throttled_s += pause
+                    self._stop.wait(pause)
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer.join()
+
+
+def lower_priority(nice: int = None, threads: int = None):
+    """Run at a lower CPU priority with few torch threads so serving is not starved"""
+    nice = nice if nice is not None else int(os.getenv("WATCH_NICE", 10))
+    threads = threads or int(os.getenv("WATCH_TORCH_THREADS", 1))
+    try:
+        os.nice(nice)
+    except (AttributeError, OSError):
+        pass
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
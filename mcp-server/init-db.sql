@@ -11,7 +11,9 @@ CREATE TABLE IF NOT EXISTS processed_files (
     file_size BIGINT,
     last_modified TIMESTAMP,
     processed_at TIMESTAMP DEFAULT NOW(),
-    chunk_count INTEGER
+    chunk_count INTEGER,
+    complete BOOLEAN DEFAULT TRUE,  -- FALSE when pages were lost to extraction time budgets
+    attempts INTEGER DEFAULT 1      -- extractions of this file_hash; caps retries of incomplete ones
 );
 
 -- Main documents table
@@ -20,6 +22,8 @@ CREATE TABLE IF NOT EXISTS documents (
     filename VARCHAR(255),
     file_hash VARCHAR(64),
     total_pages INTEGER,
+    category VARCHAR(100),
+    metadata JSONB DEFAULT '{}',
     created_at TIMESTAMP DEFAULT NOW()
 );
 
@@ -32,14 +36,27 @@ CREATE TABLE IF NOT EXISTS document_chunks (
     content TEXT,
     embedding vector(384),  -- dimension for all-MiniLM-L6-v2 model
     metadata JSONB,
+    category VARCHAR(100),  -- copied from documents.category so filters need no join
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Columns added after the first release. This script only runs on an empty
+-- volume; existing databases are upgraded by VectorStore.ensure_schema()
+-- when the server or ingestion connects.
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS category VARCHAR(100);
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS metadata JSONB DEFAULT '{}';
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS category VARCHAR(100);
+
 -- Indexes for fast similarity search
 CREATE INDEX IF NOT EXISTS idx_chunks_embedding ON document_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 CREATE INDEX IF NOT EXISTS idx_chunks_document ON document_chunks(document_id);
 CREATE INDEX IF NOT EXISTS idx_processed_hash ON processed_files(file_hash);
 
+-- Indexes for metadata filters (per-category ANN indexes: ingest.py --category-indexes)
+CREATE INDEX IF NOT EXISTS idx_chunks_category ON document_chunks(category);
+CREATE INDEX IF NOT EXISTS idx_documents_created ON documents(created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_metadata ON documents USING gin (metadata);
+
 -- Grant permissions
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO admin;
 GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA public TO admin;
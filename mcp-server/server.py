@@ -1,12 +1,26 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
+from datetime import datetime
 import os
 import requests
 import json
+import logging
+import time
+from tools import metrics
 from tools.postgres_tool import PostgresTool
-from tools.ollama_tool import OllamaTool
+from tools.ollama_tool import OllamaTool, OllamaError
 from tools.rag_tool import RAGTool
+from tools.schema_catalog import SchemaCatalog
+from tools.sql_plan_cache import SQLPlanCache
+from tools.response_cache import ResponseCache, response_key
+from tools.router import build_classification_prompt
+from tools.model_scheduler import PRIORITY_INTERACTIVE
+from tools.batch_tool import BatchAnswerer
+
+metrics.configure_logging()
+logger = logging.getLogger("mcp.server")
 
 app = FastAPI()
 
@@ -14,62 +28,222 @@ app = FastAPI()
 postgres_tool = PostgresTool()
 ollama_tool = OllamaTool()
 rag_tool = RAGTool()
+schema_catalog = SchemaCatalog(postgres_tool)
+sql_plan_cache = SQLPlanCache()
+response_cache = ResponseCache()
+# Router replies for cache: true requests, so identical concurrent requests
+# also share one classification call
+intent_cache = ResponseCache()
+# Generated SQL runs read-only with EXPLAIN/timeout/LIMIT guards unless disabled
+sql_guard_enabled = os.getenv("SQL_GUARD_ENABLED", "true").lower() != "false"
+metrics.register_scheduler(ollama_tool.scheduler)
+
+def release_connections():
+    """Close database connections held by this process; used before forking workers"""
+    postgres_tool.close()
+    rag_tool.vector_store.close()
+
+class SearchFilters(BaseModel):
+    """Metadata filters for document retrieval (FARMING route)"""
+    category: Optional[Union[str, List[str]]] = None
+    filenames: Optional[List[str]] = None
+    document_ids: Optional[List[int]] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    page_min: Optional[int] = None
+    page_max: Optional[int] = None
+    # JSONB containment against documents.metadata
+    metadata: Optional[dict] = None
+
+    def to_dict(self) -> Optional[dict]:
+        return self.dict(exclude_none=True) or None
 
 class PromptRequest(BaseModel):
     messages: List[dict]
     model: str = "llama3"
+    filters: Optional[SearchFilters] = None
+    # Ollama generation options (temperature, seed, ...) for the chat route
+    options: Optional[dict] = None
+    # Opt in to reusing an answer for an identical (model, messages, options) chat
+    cache: bool = False
+
+class BatchItem(BaseModel):
+    question: str
+    id: Optional[str] = None
+    # FARMING, POSTGRES or OLLAMA; classified by the LLM when omitted
+    route: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    model: str = "llama3"
+    top_k: int = 5
+    concurrency: int = 4
+    filters: Optional[SearchFilters] = None
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # Context set here is copied into the endpoint's task and threadpool worker
+    request_id = request.headers.get("X-Request-ID") or metrics.new_request_id()
+    metrics.begin_request(request_id)
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+def answer_sql(user_message: str, model: str, priority: int = PRIORITY_INTERACTIVE) -> str:
+    """Generate (or reuse) SQL for a question, run it and format the result"""
+    # Ask Llama to generate SQL against the cached schema, then execute it.
+    # Questions seen before reuse the SQL that already ran successfully.
+    with metrics.span("schema_catalog"):
+        schema_text = schema_catalog.prompt_text()
+    sql_query = sql_plan_cache.get(user_message, schema_catalog.fingerprint)
+    from_cache = sql_query is not None
+    metrics.record_cache("sql_plan", from_cache)
+
+    if not from_cache:
+        sql_prompt = "Generate a valid PostgreSQL query for the following request. Reply ONLY with the SQL query, no markdown."
+        if schema_text:
+            sql_prompt += f"\n\nDatabase schema (table(column type, ...)):\n{schema_text}"
+        sql_prompt += f"\n\nRequest: {user_message}"
+        with metrics.span("sql_generate"):
+            sql_query = ollama_tool.generate_response(sql_prompt, model, priority=priority).strip()
+        # Clean up SQL (remove markdown code blocks if any)
+        sql_query = sql_query.replace("```sql", "").replace("```", "").strip()
+
+    logger.info(f"Executing SQL{' (cached plan)' if from_cache else ''}: {sql_query}")
+    with metrics.span("sql_execute"):
+        if sql_guard_enabled:
+            result = postgres_tool.execute_query_guarded(sql_query)
+        else:
+            result = postgres_tool.execute_query_streaming(sql_query)
+    if result.get("status") == "error":
+        metrics.record_error("sql_execute")
+        if from_cache:
+            sql_plan_cache.discard(user_message, schema_catalog.fingerprint)
+    elif "rows_json" in result:
+        # Only read queries are replayed; re-running DML from a cache is never safe
+        sql_plan_cache.put(user_message, sql_query, schema_catalog.fingerprint)
+    elif sql_query.upper().startswith(("CREATE", "ALTER", "DROP")):
+        schema_catalog.invalidate()
+    if "rows_json" not in result:
+        return f"Executed SQL: {sql_query}\n\nResult:\n{json.dumps(result, indent=2)}"
+    content = f"Executed SQL: {sql_query}\n\nResult:\n{result['rows_json']}"
+    if result.get("notice"):
+        content += f"\n\n{result['notice']}"
+    return content
 
+batch_answerer = BatchAnswerer(rag_tool, ollama_tool, sql_handler=answer_sql)
+batch_max_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", 8))
+
+# Plain def: FastAPI runs it in its threadpool, so concurrent requests reach
+# the model scheduler instead of blocking the event loop one at a time
 @app.post("/prompt")
-async def process_prompt(request: PromptRequest):
+def process_prompt(request: PromptRequest, response: Response):
+    start = time.perf_counter()
+    metrics.set_labels(model=request.model)
     try:
         user_message = request.messages[-1]['content']
-        print(f"Received request with model: {request.model}")
+        logger.info(f"Received request with model: {request.model}")
+        
+        cache_key = response_key(request.model, request.messages, request.options) if request.cache else None
+        if cache_key:
+            # Entries only exist for requests that were routed to chat, so a hit
+            # skips classification as well as generation
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                metrics.set_labels(intent="OLLAMA")
+                metrics.record_cache_event("response", "hit")
+                return {"content": cached}
         
         # Simple Agent Logic:
         # 1. Ask Llama to classify intent
         # 2. Route to appropriate tool
         
-        classification_prompt = f"""
-        You are an AI assistant router. Analyze the following user request and decide which tool to use.
-        Available tools:
-        1. POSTGRES: Use this for database queries, checking users, or SQL related tasks.
-        2. FARMING: Use this for questions about farming, agriculture, crops, livestock, or farming practices.
-        3. OLLAMA: Use this for general chat, coding questions, or anything not related to database or farming.
-        
-        User Request: "{user_message}"
+        classification_prompt = build_classification_prompt(user_message)
+        classify = lambda: ollama_tool.generate_response(classification_prompt, request.model, raise_errors=True)
         
-        Reply ONLY with "POSTGRES", "FARMING", or "OLLAMA".
-        """
-        
-        intent = ollama_tool.generate_response(classification_prompt, request.model).strip().upper()
-        print(f"Intent detected: {intent}, using model: {request.model}")
+        with metrics.span("classify"):
+            try:
+                if cache_key:
+                    intent, source = intent_cache.get_or_generate(cache_key, classify)
+                    metrics.record_cache_event("intent", source)
+                else:
+                    intent = classify()
+            except OllamaError as e:
+                # Unclassifiable requests fall through to chat, which reports the error
+                intent = str(e)
+            intent = intent.strip().upper()
+        logger.info(f"Intent detected: {intent}, using model: {request.model}")
 
         if "FARMING" in intent:
             # Route to RAG tool for farming questions
-            print(f"[MCP Server] Routing to RAG tool for farming query")
-            result = rag_tool.generate_answer(user_message, model=request.model)
+            metrics.set_labels(intent="FARMING")
+            logger.info("Routing to RAG tool for farming query")
+            filters = request.filters.to_dict() if request.filters else None
+            result = rag_tool.generate_answer(user_message, model=request.model, filters=filters)
             return {"content": result['answer']}
         
         elif "POSTGRES" in intent:
-            # If Postgres, we might need to generate SQL first or just pass the query
-            # For this demo, let's ask Llama to generate SQL, then execute it
-            sql_prompt = f"Generate a valid SQL query for the following request. Reply ONLY with the SQL query, no markdown. Request: {user_message}"
-            sql_query = ollama_tool.generate_response(sql_prompt, request.model).strip()
-            # Clean up SQL (remove markdown code blocks if any)
-            sql_query = sql_query.replace("```sql", "").replace("```", "").strip()
-            
-            print(f"Executing SQL: {sql_query}")
-            result = postgres_tool.execute_query(sql_query)
-            return {"content": f"Executed SQL: {sql_query}\n\nResult:\n{json.dumps(result, indent=2)}"}
+            metrics.set_labels(intent="POSTGRES")
+            return {"content": answer_sql(user_message, request.model)}
             
         else:
             # Default to Ollama Chat
-            response = ollama_tool.chat(request.messages, request.model)
-            return {"content": response}
+            metrics.set_labels(intent="OLLAMA")
+            generate = lambda: ollama_tool.chat(request.messages, request.model, options=request.options,
+                                                raise_errors=True)
+            with metrics.span("chat"):
+                try:
+                    if cache_key:
+                        # Failures raise, so they are shared with waiting requests but never stored
+                        answer, source = response_cache.get_or_generate(cache_key, generate)
+                        metrics.record_cache_event("response", source)
+                    else:
+                        answer = generate()
+                except OllamaError as e:
+                    answer = str(e)
+            return {"content": answer}
 
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error(f"Error: {e}")
+        metrics.record_error("prompt")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Lets clients (e.g. the load test) see which route answered
+        response.headers["X-MCP-Intent"] = metrics.current_labels()["intent"]
+        metrics.observe_request(time.perf_counter() - start)
+
+@app.post("/prompt/batch")
+def process_batch(request: BatchRequest):
+    """Answer many questions; results stream back as JSON lines in completion order"""
+    items = [item.dict(exclude_none=True) for item in request.items]
+    concurrency = min(max(1, request.concurrency), batch_max_concurrency)
+    filters = request.filters.to_dict() if request.filters else None
+
+    def stream():
+        # Runs after the endpoint returns; labels set in the endpoint would not reach it
+        metrics.set_labels(model=request.model)
+        for result in batch_answerer.run(items, model=request.model, top_k=request.top_k,
+                                         concurrency=concurrency, filters=filters):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    return ollama_tool.scheduler.stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"response_cache": response_cache.stats(), "intent_cache": intent_cache.stats()}
+
+@app.get("/sql/stats")
+async def sql_stats():
+    return {"plan_cache": sql_plan_cache.stats(), "schema_catalog": schema_catalog.stats()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    payload, content_type = metrics.render_latest()
+    return Response(payload, media_type=content_type)
 
 @app.get("/health")
 async def health():
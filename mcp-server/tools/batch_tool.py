@@ -0,0 +1,177 @@
+"""
+Batch Answering
+Answers many questions in one job: batched embedding and retrieval for the
+FARMING route, intent classification only when no route is given, and
+generations with bounded concurrency at background priority
+"""
+
+import contextvars
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tools import metrics
+from tools.model_scheduler import PRIORITY_BACKGROUND
+from tools.router import ROUTES, build_classification_prompt, parse_intent
+
+logger = logging.getLogger("mcp.batch")
+
+
+class BatchAnswerer:
+    def __init__(self, rag_tool, ollama_tool, sql_handler: Callable = None,
+                 priority: int = PRIORITY_BACKGROUND):
+        """
+        Initialize batch answerer
+
+        Args:
+            rag_tool: RAGTool for retrieval and answer generation
+            ollama_tool: OllamaTool for classification and chat
+            sql_handler: Callable(question, model, priority) -> str for the POSTGRES route;
+                POSTGRES items fail when not provided
+            priority: Scheduler priority for every LLM call of the job
+        """
+        self.rag_tool = rag_tool
+        self.ollama_tool = ollama_tool
+        self.sql_handler = sql_handler
+        self.priority = priority
+
+    def _classify(self, question: str, model: str) -> str:
+        reply = self.ollama_tool.generate_response(
+            build_classification_prompt(question), model, priority=self.priority, raise_errors=True
+        )
+        return parse_intent(reply)
+
+    def _answer(self, item: Dict, route: str, model: str, search_results: Optional[List]) -> Dict:
+        start = time.perf_counter()
+        result = {"id": item.get("id"), "index": item["index"], "route": route}
+        try:
+            if route == "FARMING":
+                rag = self.rag_tool.answer_from_results(
+                    item["question"], search_results or [], model=model, priority=self.priority,
+                    raise_errors=True
+                )
+                result["answer"] = rag["answer"]
+                result["sources"] = [
+                    {"filename": s["filename"], "page_number": s["page_number"],
+                     "similarity": round(float(s["similarity"]), 4)}
+                    for s in rag.get("sources", [])
+                ]
+            elif route == "POSTGRES":
+                if self.sql_handler is None:
+                    raise ValueError("POSTGRES route is not available in this batch runner")
+                result["answer"] = self.sql_handler(item["question"], model, priority=self.priority)
+            else:
+                messages = item.get("messages") or [{"role": "user", "content": item["question"]}]
+                result["answer"] = self.ollama_tool.chat(messages, model, priority=self.priority,
+                                                         raise_errors=True)
+        except Exception as e:
+            result.update(self._error_result(item, route, e))
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    def _submit(self, pool: ThreadPoolExecutor, fn: Callable, *args, **labels):
+        """Run fn in the pool with the job's request ID and metric labels, plus labels for this item"""
+        def call():
+            if labels:
+                metrics.set_labels(**labels)
+            return fn(*args)
+        return pool.submit(contextvars.copy_context().run, call)
+
+    def _error_result(self, item: Dict, route: Optional[str], error: Exception) -> Dict:
+        logger.error(f"Item {item.get('id', item['index'])} failed: {error}")
+        return {"id": item.get("id"), "index": item["index"], "route": route, "error": str(error)}
+
+    def _prepare_window(self, window: List[Dict], model: str, top_k: int, pool: ThreadPoolExecutor,
+                        filters: Optional[Dict] = None) -> Tuple[List[tuple], List[Dict]]:
+        """
+        Resolve routes and run batched retrieval for one window of items
+
+        Returns:
+            Tuple of (ready (item, route, search_results) tuples, error results for
+            items whose classification or retrieval failed)
+        """
+        routes = [item.get("route") for item in window]
+        failed = {}
+        missing = [i for i, route in enumerate(routes) if not route]
+        if missing:
+            futures = {i: self._submit(pool, self._classify, window[i]["question"], model, model=model)
+                       for i in missing}
+            for i, future in futures.items():
+                try:
+                    routes[i] = future.result()
+                except Exception as e:
+                    failed[i] = self._error_result(window[i], None, e)
+
+        farming = [i for i, route in enumerate(routes) if route == "FARMING" and i not in failed]
+        retrieved = {}
+        if farming:
+            try:
+                batches = self.rag_tool.search_documents_batch(
+                    [window[i]["question"] for i in farming], top_k=top_k, filters=filters
+                )
+                retrieved = dict(zip(farming, batches))
+            except Exception as e:
+                # Only this window's FARMING items fail; the job keeps streaming
+                for i in farming:
+                    failed[i] = self._error_result(window[i], "FARMING", e)
+
+        ready = [(item, routes[i], retrieved.get(i)) for i, item in enumerate(window) if i not in failed]
+        return ready, list(failed.values())
+
+    def run(self, items: Iterable[Dict], model: str = "llama3", top_k: int = 5,
+            concurrency: int = 4, window_size: int = 64, filters: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Answer items, yielding results as they complete (not in input order)
+
+        Args:
+            items: Dicts with "question" and optional "id", "route" and "messages"
+            model: Model used for classification and generation
+            top_k: Chunks retrieved per FARMING question
+            concurrency: Generations in flight at once
+            window_size: Questions embedded and retrieved per batch
+            filters: Metadata filters for FARMING retrieval
+
+        Yields:
+            Dicts with id, index, route, answer (or error), sources and latency_ms
+        """
+        concurrency = max(1, concurrency)
+        pending = set()
+
+        def drain(limit: int):
+            nonlocal pending
+            while len(pending) > limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            window = []
+            for index, raw in enumerate(items):
+                item = dict(raw, index=index)
+                route = (item.get("route") or "").upper() or None
+                if route and route not in ROUTES:
+                    yield {"id": item.get("id"), "index": index, "route": route,
+                           "error": f"Unknown route {route}"}
+                    continue
+                item["route"] = route
+                window.append(item)
+                if len(window) < window_size:
+                    continue
+
+                prepared, failed = self._prepare_window(window, model, top_k, pool, filters)
+                yield from failed
+                for ready, route, results in prepared:
+                    pending.add(self._submit(pool, self._answer, ready, route, model, results,
+                                             intent=route, model=model))
+                window = []
+                # Bound queued work to about two windows so memory stays flat for large jobs
+                yield from drain(2 * window_size)
+
+            if window:
+                prepared, failed = self._prepare_window(window, model, top_k, pool, filters)
+                yield from failed
+                for ready, route, results in prepared:
+                    pending.add(self._submit(pool, self._answer, ready, route, model, results,
+                                             intent=route, model=model))
+            yield from drain(0)
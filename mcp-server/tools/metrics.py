@@ -0,0 +1,165 @@
+"""
+Metrics
+Per-stage timing spans, Prometheus metrics and request-scoped logging context
+"""
+
+import contextvars
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+
+request_id_var = contextvars.ContextVar("request_id", default="-")
+_labels_var = contextvars.ContextVar("metric_labels", default=None)
+
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_LATENCY = Histogram(
+    "mcp_stage_latency_seconds", "Latency of each /prompt stage",
+    ["stage", "intent", "model"], buckets=_BUCKETS
+)
+REQUEST_LATENCY = Histogram(
+    "mcp_request_latency_seconds", "End-to-end /prompt latency",
+    ["intent", "model"], buckets=_BUCKETS
+)
+ERRORS = Counter("mcp_errors_total", "Errors by stage", ["stage"])
+CACHE_EVENTS = Counter("mcp_cache_events_total", "Cache lookups by cache and result", ["cache", "result"])
+# Scheduler gauges are set on every queue change rather than computed at scrape
+# time, so they aggregate across gunicorn workers (live* modes drop dead workers)
+OLLAMA_QUEUE_DEPTH = Gauge(
+    "mcp_ollama_queue_depth", "Requests waiting for an Ollama slot", multiprocess_mode="livesum"
+)
+OLLAMA_INFLIGHT = Gauge(
+    "mcp_ollama_inflight", "Ollama requests in flight", multiprocess_mode="livesum"
+)
+OLLAMA_OLDEST_WAIT = Gauge(
+    "mcp_ollama_oldest_wait_seconds", "Wait of the oldest queued Ollama request", multiprocess_mode="livemax"
+)
+OLLAMA_MODEL_SWAPS = Gauge(
+    "mcp_ollama_model_swaps", "Model swaps observed by the scheduler", multiprocess_mode="sum"
+)
+
+_schedulers = []
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request ID to every log record"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+def configure_logging(level: int = logging.INFO):
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s - %(levelname)s - [%(request_id)s] %(name)s - %(message)s"
+    ))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def begin_request(request_id: str = None, **labels):
+    """Set the request ID and default metric labels for the current context"""
+    request_id_var.set(request_id or new_request_id())
+    _labels_var.set({"intent": "unknown", "model": "unknown", **labels})
+
+
+def set_labels(**labels):
+    """Update labels (e.g. intent once classified) for later spans in this request"""
+    current = dict(_labels_var.get() or {})
+    current.update(labels)
+    _labels_var.set(current)
+
+
+def current_labels() -> dict:
+    return {"intent": "unknown", "model": "unknown", **(_labels_var.get() or {})}
+
+
+def record_error(stage: str):
+    ERRORS.labels(stage).inc()
+
+
+def record_cache(cache: str, hit: bool):
+    record_cache_event(cache, "hit" if hit else "miss")
+
+
+def record_cache_event(cache: str, result: str):
+    """Count a cache lookup with an arbitrary result (e.g. "shared" for in-flight dedup)"""
+    CACHE_EVENTS.labels(cache, result).inc()
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """
+    Time a stage and record it in the stage latency histogram
+
+    Args:
+        stage: Stage name (classify, embed, vector_search, ...)
+        labels: Overrides for the request's intent/model labels
+    """
+    logger = logging.getLogger("mcp.span")
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        record_error(stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        merged = {**current_labels(), **labels}
+        STAGE_LATENCY.labels(stage, merged["intent"], merged["model"]).observe(elapsed)
+        logger.info(f"stage={stage} intent={merged['intent']} model={merged['model']} ms={elapsed * 1000:.1f}")
+
+
+def observe_request(elapsed: float):
+    labels = current_labels()
+    REQUEST_LATENCY.labels(labels["intent"], labels["model"]).observe(elapsed)
+
+
+def is_multiprocess() -> bool:
+    # Set by gunicorn.conf.py before prometheus_client is imported
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_latest() -> tuple:
+    """
+    Render the metrics exposition, aggregating across workers in multi-process mode
+
+    Returns:
+        Tuple of (payload bytes, content type)
+    """
+    # Oldest wait grows between queue changes; refresh this worker's value
+    for scheduler in _schedulers:
+        _publish_scheduler(scheduler)
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def _publish_scheduler(scheduler):
+    stats = scheduler.stats()
+    OLLAMA_QUEUE_DEPTH.set(stats["queue_depth"])
+    OLLAMA_INFLIGHT.set(sum(stats["inflight_by_model"].values()))
+    OLLAMA_OLDEST_WAIT.set(stats["oldest_wait_ms"] / 1000)
+    OLLAMA_MODEL_SWAPS.set(stats["model_swaps"])
+
+
+def register_scheduler(scheduler):
+    """Expose model scheduler queue state as gauges, in single- and multi-process mode"""
+    _schedulers.append(scheduler)
+    scheduler.add_listener(_publish_scheduler)
+    _publish_scheduler(scheduler)
@@ -0,0 +1,233 @@
+"""
+Model Scheduler
+Limits in-flight Ollama requests per model and orders queued requests so that
+requests for an already loaded model go first, minimising model swaps
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class _Waiter:
+    __slots__ = ("model", "priority", "seq", "enqueued_at", "granted")
+
+    def __init__(self, model: str, priority: int, seq: int):
+        self.model = model
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+def per_worker_limit(limit: int) -> int:
+    """
+    Share of a service-wide limit for one server process: every gunicorn
+    worker (WEB_CONCURRENCY) runs its own scheduler, so the env limits are split
+    """
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+    return max(1, limit // workers)
+
+
+class ModelScheduler:
+    def __init__(self, max_inflight_per_model: int = None, max_loaded_models: int = None,
+                 max_wait_s: float = None, model_options: Dict[str, Dict] = None):
+        """
+        Initialize scheduler
+
+        Args:
+            max_inflight_per_model: Concurrent requests allowed per model (default:
+                OLLAMA_MAX_INFLIGHT_PER_MODEL split across workers)
+            max_loaded_models: Models allowed to have requests in flight at the same time
+                (default: OLLAMA_MAX_LOADED_MODELS split across workers, at least 1)
+            max_wait_s: Wait after which a queued request is served before any model grouping
+            model_options: Per-model overrides, e.g. {"llama3": {"keep_alive": "1h", "num_ctx": 8192}}
+        """
+        self.max_inflight_per_model = max_inflight_per_model or per_worker_limit(
+            int(os.getenv("OLLAMA_MAX_INFLIGHT_PER_MODEL", 2))
+        )
+        self.max_loaded_models = max_loaded_models or per_worker_limit(
+            int(os.getenv("OLLAMA_MAX_LOADED_MODELS", 1))
+        )
+        self.max_wait_s = max_wait_s if max_wait_s is not None else float(os.getenv("OLLAMA_SCHEDULER_MAX_WAIT", 10))
+        self.default_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        num_ctx = os.getenv("OLLAMA_NUM_CTX")
+        self.default_num_ctx = int(num_ctx) if num_ctx else None
+        self.model_options = model_options or json.loads(os.getenv("OLLAMA_MODEL_OPTIONS", "{}"))
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._inflight = {}
+        self._seq = 0
+        self._last_model = None
+
+        self._swaps = 0
+        self._completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Call callback(scheduler) whenever queue or in-flight state changes
+        (under the scheduler lock, so it may call stats() but must not block)
+        """
+        with self._cond:
+            self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback(self)
+            except Exception:
+                pass
+
+    def request_options(self, model: str) -> Dict:
+        """
+        Build the keep_alive / options fields to send with a request for a model
+
+        Returns:
+            Dict to merge into the Ollama request payload
+        """
+        overrides = self.model_options.get(model, {})
+        payload = {}
+
+        keep_alive = overrides.get("keep_alive", self.default_keep_alive)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+
+        num_ctx = overrides.get("num_ctx", self.default_num_ctx)
+        if num_ctx:
+            payload["options"] = {"num_ctx": int(num_ctx)}
+
+        return payload
+
+    def _can_run(self, model: str) -> bool:
+        active = [m for m, count in self._inflight.items() if count > 0]
+        if self._inflight.get(model, 0) >= self.max_inflight_per_model:
+            return False
+        return model in active or len(active) < self.max_loaded_models
+
+    def _pick(self) -> Optional[_Waiter]:
+        """Select the next waiter to admit, or None if the head of the queue must wait"""
+        if not self._queue:
+            return None
+
+        now = time.monotonic()
+
+        def service_class(w):
+            aged = now - w.enqueued_at >= self.max_wait_s
+            return (0 if aged else 1, w.priority)
+
+        # Only the most urgent class may be admitted; lower classes wait so
+        # that a blocked urgent request lets the active model drain
+        head_class = min(service_class(w) for w in self._queue)
+        candidates = [w for w in self._queue if service_class(w) == head_class and self._can_run(w.model)]
+        if not candidates:
+            return None
+
+        def swap_cost(w):
+            loaded = self._inflight.get(w.model, 0) > 0 or w.model == self._last_model
+            return (0 if loaded else 1, w.seq)
+
+        return min(candidates, key=swap_cost)
+
+    def _dispatch(self):
+        admitted = False
+        while True:
+            waiter = self._pick()
+            if waiter is None:
+                break
+            self._queue.remove(waiter)
+            if self._inflight.get(waiter.model, 0) == 0 and waiter.model != self._last_model \
+                    and self._last_model is not None:
+                self._swaps += 1
+            self._inflight[waiter.model] = self._inflight.get(waiter.model, 0) + 1
+            self._last_model = waiter.model
+            waiter.granted = True
+            admitted = True
+        if admitted:
+            self._cond.notify_all()
+
+    def acquire(self, model: str, priority: int = PRIORITY_INTERACTIVE):
+        """Block until a request for the given model may be sent to Ollama"""
+        with self._cond:
+            self._seq += 1
+            waiter = _Waiter(model, priority, self._seq)
+            self._queue.append(waiter)
+            self._dispatch()
+            self._notify()
+            while not waiter.granted:
+                # Periodic wake-up lets aged waiters change the admission order
+                self._cond.wait(timeout=self.max_wait_s)
+                if not waiter.granted:
+                    self._dispatch()
+                    self._notify()
+
+            waited = time.monotonic() - waiter.enqueued_at
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._notify()
+
+    def release(self, model: str):
+        """Mark a request for the given model as finished"""
+        with self._cond:
+            self._inflight[model] = max(0, self._inflight.get(model, 0) - 1)
+            self._completed += 1
+            self._dispatch()
+            self._notify()
+
+    @contextmanager
+    def slot(self, model: str, priority: int = PRIORITY_INTERACTIVE):
+        """
+        Hold a scheduling slot for the duration of one Ollama request
+
+        Yields:
+            Request options (keep_alive, num_ctx) for the model
+        """
+        self.acquire(model, priority)
+        try:
+            yield self.request_options(model)
+        finally:
+            self.release(model)
+
+    def stats(self) -> Dict:
+        """Queue depth, in-flight counts and wait times"""
+        with self._cond:
+            now = time.monotonic()
+            depth_by_model = {}
+            for w in self._queue:
+                depth_by_model[w.model] = depth_by_model.get(w.model, 0) + 1
+            admitted = self._completed + sum(self._inflight.values())
+            return {
+                "queue_depth": len(self._queue),
+                "queue_depth_by_model": depth_by_model,
+                "inflight_by_model": {m: c for m, c in self._inflight.items() if c > 0},
+                "oldest_wait_ms": round(max((now - w.enqueued_at for w in self._queue), default=0.0) * 1000, 1),
+                "avg_wait_ms": round(self._total_wait / admitted * 1000, 1) if admitted else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 1),
+                "model_swaps": self._swaps,
+                "completed": self._completed,
+                "last_model": self._last_model,
+            }
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> ModelScheduler:
+    """Process-wide scheduler shared by every OllamaTool"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = ModelScheduler()
+        return _default_scheduler
@@ -1,47 +1,95 @@
 import requests
 import os
 import json
+import logging
+import time
+from contextlib import contextmanager
+from tools import metrics
+from tools.model_scheduler import get_scheduler, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger("mcp.ollama")
+
+
+class OllamaError(RuntimeError):
+    """A failed Ollama call; str() is the text returned in place of an answer by default"""
+
 
 class OllamaTool:
-    def __init__(self):
+    def __init__(self, scheduler=None):
         self.host = os.getenv("OLLAMA_HOST", "http://host.docker.internal:11434")
         self.model = os.getenv("OLLAMA_MODEL", "llama3")
+        self.scheduler = scheduler or get_scheduler()
+        # (connect, read) timeouts: a hung Ollama call must not hold its scheduler slot forever
+        self.timeout = (
+            float(os.getenv("OLLAMA_CONNECT_TIMEOUT", 5)),
+            float(os.getenv("OLLAMA_TIMEOUT", 300))
+        )
+
+    @contextmanager
+    def _slot(self, model: str, priority: int):
+        # Time spent queued behind other models is reported as its own stage
+        queued_at = time.perf_counter()
+        with self.scheduler.slot(model, priority) as model_options:
+            metrics.STAGE_LATENCY.labels("ollama_queue", metrics.current_labels()["intent"], model).observe(
+                time.perf_counter() - queued_at
+            )
+            yield model_options
 
-    def generate_response(self, prompt: str, model: str = None) -> str:
+    def generate_response(self, prompt: str, model: str = None, priority: int = PRIORITY_INTERACTIVE,
+                          raise_errors: bool = False) -> str:
+        """Failures come back as "Error..." text, or raise OllamaError if raise_errors"""
         try:
             model_to_use = model or self.model
-            response = requests.post(
-                f"{self.host}/api/generate",
-                json={
-                    "model": model_to_use,
-                    "prompt": prompt,
-                    "stream": False
-                }
-            )
+            with self._slot(model_to_use, priority) as model_options:
+                response = requests.post(
+                    f"{self.host}/api/generate",
+                    json={
+                        "model": model_to_use,
+                        "prompt": prompt,
+                        "stream": False,
+                        **model_options
+                    },
+                    timeout=self.timeout
+                )
             if response.status_code == 200:
                 return response.json().get("response", "")
             else:
-                return f"Error: {response.text}"
+                metrics.record_error("ollama_generate")
+                error = OllamaError(f"Error: {response.text}")
         except Exception as e:
-            return f"Error connecting to Ollama: {str(e)}"
+            metrics.record_error("ollama_generate")
+            error = OllamaError(f"Error connecting to Ollama: {str(e)}")
+        if raise_errors:
+            raise error
+        return str(error)
 
-    def chat(self, messages: list, model: str = None) -> str:
+    def chat(self, messages: list, model: str = None, priority: int = PRIORITY_INTERACTIVE,
+             options: dict = None, raise_errors: bool = False) -> str:
+        """Failures come back as "Error..." text, or raise OllamaError if raise_errors"""
         try:
             model_to_use = model or self.model
-            print(f"[OllamaTool] Calling Ollama chat API with model: {model_to_use}")
-            response = requests.post(
-                f"{self.host}/api/chat",
-                json={
+            logger.info(f"Calling Ollama chat API with model: {model_to_use}")
+            with self._slot(model_to_use, priority) as model_options:
+                payload = {
                     "model": model_to_use,
                     "messages": messages,
-                    "stream": False
+                    "stream": False,
+                    **model_options
                 }
-            )
+                if options:
+                    # Per-request generation options (temperature, seed, ...) on top of the model's
+                    payload["options"] = {**model_options.get("options", {}), **options}
+                response = requests.post(f"{self.host}/api/chat", json=payload, timeout=self.timeout)
             if response.status_code == 200:
                 result = response.json().get("message", {}).get("content", "")
-                print(f"[OllamaTool] Received response from {model_to_use}")
+                logger.info(f"Received response from {model_to_use}")
                 return result
             else:
-                return f"Error: {response.text}"
+                metrics.record_error("ollama_chat")
+                error = OllamaError(f"Error: {response.text}")
         except Exception as e:
-            return f"Error connecting to Ollama: {str(e)}"
+            metrics.record_error("ollama_chat")
+            error = OllamaError(f"Error connecting to Ollama: {str(e)}")
+        if raise_errors:
+            raise error
+        return str(error)
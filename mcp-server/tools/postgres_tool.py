@@ -1,5 +1,26 @@
 import psycopg2
+import psycopg2.pool
 import os
+import io
+import json
+import threading
+import uuid
+from tools.sql_guard import SQLGuard, SQLGuardError
+
+
+def worker_pool_size(pools_per_worker: int = 2) -> int:
+    """
+    Size of one connection pool in a server process: POSTGRES_POOL_MAX if set,
+    otherwise the service-wide POSTGRES_MAX_CONNECTIONS budget split across
+    WEB_CONCURRENCY workers and the pools each worker holds (SQL tool, vector search)
+    """
+    explicit = os.getenv("POSTGRES_POOL_MAX")
+    if explicit:
+        return max(1, int(explicit))
+    budget = int(os.getenv("POSTGRES_MAX_CONNECTIONS", 20))
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+    return max(2, budget // (workers * pools_per_worker))
+
 
 class PostgresTool:
     def __init__(self):
@@ -8,15 +29,63 @@ class PostgresTool:
         self.user = os.getenv("POSTGRES_USER", "admin")
         self.password = os.getenv("POSTGRES_PASSWORD", "admin")
         self.dbname = os.getenv("POSTGRES_DB", "mcpdb")
+        self.fetch_batch_size = int(os.getenv("SQL_FETCH_BATCH_SIZE", 500))
+        self.max_result_rows = int(os.getenv("SQL_MAX_RESULT_ROWS", 1000))
+        self.max_result_bytes = int(os.getenv("SQL_MAX_RESULT_BYTES", 256 * 1024))
+        self.guard = SQLGuard()
+        self.pool_size = worker_pool_size()
+        self._pool = None
+        self._pool_pid = None
+        self._pool_slots = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        # Pools are created lazily per process so forked workers never share sockets
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = psycopg2.pool.ThreadedConnectionPool(
+                    1, self.pool_size,
+                    host=self.host,
+                    port=self.port,
+                    user=self.user,
+                    password=self.password,
+                    dbname=self.dbname
+                )
+                self._pool_pid = os.getpid()
+                self._pool_slots = threading.BoundedSemaphore(self.pool_size)
+            return self._pool
 
     def get_connection(self):
-        return psycopg2.connect(
-            host=self.host,
-            port=self.port,
-            user=self.user,
-            password=self.password,
-            dbname=self.dbname
-        )
+        """Borrow a pooled connection; blocks while the pool is exhausted. Pair with release_connection."""
+        pool = self._get_pool()
+        self._pool_slots.acquire()
+        try:
+            return pool.getconn()
+        except Exception:
+            self._pool_slots.release()
+            raise
+
+    def release_connection(self, conn):
+        """Return a connection to the pool, discarding it if it is broken"""
+        pool = self._pool
+        try:
+            if not conn.closed:
+                conn.rollback()
+                if conn.readonly:
+                    conn.set_session(readonly=False)
+            pool.putconn(conn, close=bool(conn.closed))
+        except Exception:
+            pool.putconn(conn, close=True)
+        finally:
+            self._pool_slots.release()
+
+    def close(self):
+        """Close every pooled connection (called in the parent before forking workers)"""
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+            self._pool_pid = None
 
     def execute_query(self, query: str):
         conn = None
@@ -24,7 +93,7 @@ class PostgresTool:
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute(query)
-            
+
             if query.strip().upper().startswith("SELECT"):
                 columns = [desc[0] for desc in cursor.description]
                 results = cursor.fetchall()
@@ -32,9 +101,135 @@ class PostgresTool:
             else:
                 conn.commit()
                 return {"status": "success", "message": "Query executed successfully"}
-                
+
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        finally:
+            if conn:
+                self.release_connection(conn)
+
+    def _iter_rows(self, cursor):
+        """Yield rows as dicts from a server-side cursor, one batch at a time"""
+        columns = None
+        while True:
+            batch = cursor.fetchmany(self.fetch_batch_size)
+            if not batch:
+                return
+            if columns is None:
+                # Named cursors only populate description after the first fetch
+                columns = [desc[0] for desc in cursor.description]
+            for row in batch:
+                yield dict(zip(columns, row))
+
+    def _serialize_rows(self, rows, max_rows: int, max_bytes: int) -> dict:
+        """
+        Serialize rows into a JSON array incrementally, stopping at the row or byte cap
+
+        Returns:
+            Dict with the JSON text, row count and truncation details
+        """
+        out = io.StringIO()
+        out.write("[")
+        size = 1
+        row_count = 0
+        truncated_by = None
+
+        for row in rows:
+            if row_count >= max_rows:
+                truncated_by = "rows"
+                break
+            item = ("," if row_count else "") + "\n  " + json.dumps(row, default=str)
+            if size + len(item) + 2 > max_bytes:
+                truncated_by = "bytes"
+                break
+            out.write(item)
+            size += len(item)
+            row_count += 1
+
+        out.write("\n]" if row_count else "]")
+        result = {
+            "status": "success",
+            "rows_json": out.getvalue(),
+            "row_count": row_count,
+            "truncated": truncated_by is not None
+        }
+        if truncated_by == "rows":
+            result["notice"] = f"Result truncated to the first {row_count} rows (row limit {max_rows})."
+        elif truncated_by == "bytes":
+            result["notice"] = f"Result truncated after {row_count} rows (size limit {max_bytes} bytes)."
+        return result
+
+    def execute_query_streaming(self, query: str, max_rows: int = None, max_bytes: int = None) -> dict:
+        """
+        Execute a query through a server-side cursor so memory stays bounded
+        regardless of result size
+
+        Args:
+            query: SQL query
+            max_rows: Maximum rows to return (default SQL_MAX_RESULT_ROWS)
+            max_bytes: Maximum size of the serialized result (default SQL_MAX_RESULT_BYTES)
+
+        Returns:
+            Dict with rows_json, row_count, truncated and an optional notice,
+            or a status/message dict for non-SELECT statements and errors
+        """
+        if not query.strip().upper().startswith("SELECT"):
+            return self.execute_query(query)
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            return self._stream_select(conn, query, max_rows, max_bytes)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        finally:
+            if conn:
+                self.release_connection(conn)
+
+    def _stream_select(self, conn, query: str, max_rows: int = None, max_bytes: int = None) -> dict:
+        with conn.cursor(name=f"mcp_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = self.fetch_batch_size
+            cursor.execute(query)
+            return self._serialize_rows(
+                self._iter_rows(cursor),
+                max_rows or self.max_result_rows,
+                max_bytes or self.max_result_bytes
+            )
+
+    def execute_query_guarded(self, query: str, max_rows: int = None, max_bytes: int = None) -> dict:
+        """
+        Execute untrusted (LLM-generated) SQL: single SELECT only, read-only
+        transaction, statement_timeout, EXPLAIN cost/row check and an injected LIMIT
+
+        Args:
+            query: SQL query
+            max_rows: Maximum rows to return (default SQL_MAX_RESULT_ROWS)
+            max_bytes: Maximum size of the serialized result (default SQL_MAX_RESULT_BYTES)
+
+        Returns:
+            Same shape as execute_query_streaming, plus the plan estimates;
+            rejected queries return a status/message error dict
+        """
+        conn = None
+        try:
+            sql = self.guard.validate(query)
+            limited_sql = self.guard.apply_limit(sql, (max_rows or self.max_result_rows) + 1)
+
+            conn = self.get_connection()
+            conn.set_session(readonly=True)
+            with conn.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = %s", (self.guard.statement_timeout_ms,))
+                cursor.execute("EXPLAIN (FORMAT JSON) " + limited_sql)
+                plan = cursor.fetchone()[0][0]["Plan"]
+            estimates = self.guard.check_plan(plan)
+
+            result = self._stream_select(conn, limited_sql, max_rows, max_bytes)
+            result.update(estimates)
+            return result
+        except SQLGuardError as e:
+            return {"status": "error", "message": str(e), "rejected": True}
         except Exception as e:
             return {"status": "error", "message": str(e)}
         finally:
             if conn:
-                conn.close()
+                self.release_connection(conn)
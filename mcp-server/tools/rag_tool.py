@@ -5,37 +5,46 @@ Retrieves relevant document chunks and generates answers using Mistral LLM
 
 import sys
 import os
+import logging
 sys.path.append(os.path.join(os.path.dirname(__file__), '../ingestion'))
 
 from embeddings import EmbeddingModel
 from vector_store import VectorStore
 from tools.ollama_tool import OllamaTool
+from tools.model_scheduler import PRIORITY_INTERACTIVE
+from tools.postgres_tool import worker_pool_size
+from tools import metrics
+
+logger = logging.getLogger("mcp.rag")
 
 
 class RAGTool:
     def __init__(self):
         """Initialize RAG tool with embedding model and vector store"""
         self.embedding_model = EmbeddingModel()
-        self.vector_store = VectorStore()
+        self.vector_store = VectorStore(pool_size=worker_pool_size())
         self.ollama = OllamaTool()
-        print("[RAGTool] Initialized")
+        logger.info("Initialized")
     
-    def search_documents(self, query: str, top_k: int = 5) -> list:
+    def search_documents(self, query: str, top_k: int = 5, filters: dict = None) -> list:
         """
         Search for relevant document chunks
         
         Args:
             query: User query
             top_k: Number of results to return
+            filters: Optional metadata filters (category, filenames, created_after, ...)
             
         Returns:
             List of relevant chunks with metadata
         """
         # Generate embedding for query
-        query_embedding = self.embedding_model.embed_text(query)
+        with metrics.span("embed"):
+            query_embedding = self.embedding_model.embed_text(query)
         
         # Search vector database
-        results = self.vector_store.similarity_search(query_embedding, top_k=top_k)
+        with metrics.span("vector_search"):
+            results = self.vector_store.similarity_search(query_embedding, top_k=top_k, filters=filters)
         
         return results
     
@@ -85,36 +94,42 @@ class RAGTool:
         
         return "\n\nSources:\n" + "\n".join(sources)
     
-    def generate_answer(self, query: str, model: str = "mistral-nemo", top_k: int = 5) -> dict:
+    def search_documents_batch(self, queries: list, top_k: int = 5, filters: dict = None) -> list:
         """
-        Generate answer using RAG
+        Search for relevant chunks for many queries with one batched encode
+        and one database round trip
         
         Args:
-            query: User query
-            model: LLM model to use
-            top_k: Number of document chunks to retrieve
+            queries: User queries
+            top_k: Number of results per query
+            filters: Optional metadata filters applied to every query
             
         Returns:
-            Dict with answer and sources
+            One list of results per query, in input order
         """
-        try:
-            # Search for relevant documents
-            print(f"[RAGTool] Searching for relevant documents...")
-            search_results = self.search_documents(query, top_k=top_k)
-            
-            if not search_results:
-                return {
-                    "answer": "I don't have any information about that in my farming documents knowledge base.",
-                    "sources": []
-                }
-            
-            print(f"[RAGTool] Found {len(search_results)} relevant chunks")
-            
-            # Format context
-            context = self.format_context(search_results)
+        if not queries:
+            return []
+
+        with metrics.span("embed_batch"):
+            query_embeddings = self.embedding_model.embed_batch(queries, batch_size=64, show_progress=False)
+
+        with metrics.span("vector_search_batch"):
+            return self.vector_store.similarity_search_batch(query_embeddings, top_k=top_k, filters=filters)
+
+    def build_prompt(self, query: str, search_results: list) -> str:
+        """
+        Build the LLM prompt for a query from its retrieved chunks
+        
+        Args:
+            query: User query
+            search_results: List of search results
             
-            # Create prompt for LLM
-            prompt = f"""You are a helpful farming assistant. Answer the question based on the provided context from farming documents.
+        Returns:
+            Prompt string
+        """
+        context = self.format_context(search_results)
+
+        return f"""You are a helpful farming assistant. Answer the question based on the provided context from farming documents.
 
 Context:
 {context}
@@ -128,28 +143,77 @@ Instructions:
 - Keep your answer clear and concise
 
 Answer:"""
+
+    def answer_from_results(self, query: str, search_results: list, model: str = "mistral-nemo",
+                            priority: int = PRIORITY_INTERACTIVE, raise_errors: bool = False) -> dict:
+        """
+        Generate an answer from already retrieved chunks
+        
+        Args:
+            query: User query
+            search_results: List of search results
+            model: LLM model to use
+            priority: Scheduler priority for the generation request
+            raise_errors: Raise OllamaError on a failed generation instead of
+                returning the error text as the answer
             
-            # Generate answer using Mistral
-            print(f"[RAGTool] Generating answer with {model}...")
-            answer = self.ollama.generate_response(prompt, model=model)
-            
-            # Format sources
-            sources_text = self.format_sources(search_results)
-            
+        Returns:
+            Dict with answer and sources
+        """
+        if not search_results:
             return {
-                "answer": answer + sources_text,
-                "sources": search_results,
-                "context_used": len(search_results)
+                "answer": "I don't have any information about that in my farming documents knowledge base.",
+                "sources": []
             }
+
+        prompt = self.build_prompt(query, search_results)
+
+        # Generate answer using Mistral
+        logger.info(f"Generating answer with {model}...")
+        with metrics.span("generate", model=model):
+            answer = self.ollama.generate_response(prompt, model=model, priority=priority,
+                                                   raise_errors=raise_errors)
+
+        # Format sources
+        sources_text = self.format_sources(search_results)
+
+        return {
+            "answer": answer + sources_text,
+            "sources": search_results,
+            "context_used": len(search_results)
+        }
+
+    def generate_answer(self, query: str, model: str = "mistral-nemo", top_k: int = 5,
+                        filters: dict = None) -> dict:
+        """
+        Generate answer using RAG
+        
+        Args:
+            query: User query
+            model: LLM model to use
+            top_k: Number of document chunks to retrieve
+            filters: Optional metadata filters for retrieval
+            
+        Returns:
+            Dict with answer and sources
+        """
+        try:
+            # Search for relevant documents
+            logger.info("Searching for relevant documents...")
+            search_results = self.search_documents(query, top_k=top_k, filters=filters)
+            
+            logger.info(f"Found {len(search_results)} relevant chunks")
+            
+            return self.answer_from_results(query, search_results, model=model)
             
         except Exception as e:
-            print(f"[RAGTool] Error: {e}")
+            logger.error(f"Error: {e}")
+            metrics.record_error("rag")
             return {
                 "answer": f"Error generating answer: {str(e)}",
                 "sources": []
             }
 
-
 if __name__ == "__main__":
     # Test the RAG tool
     rag = RAGTool()
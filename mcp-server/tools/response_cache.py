@@ -0,0 +1,138 @@
+"""
+Response Cache
+Exact-match cache of chat answers keyed by (model, messages, options), with
+in-flight deduplication so concurrent identical requests share one generation
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+def response_key(model: str, messages: list, options: Optional[dict] = None) -> str:
+    """Stable hash of a chat request; dict key order does not matter"""
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "options": options or {}},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = None, ttl_s: float = None):
+        """
+        Initialize response cache
+
+        Args:
+            max_entries: LRU capacity
+            ttl_s: Seconds an entry stays valid
+        """
+        self.max_entries = max_entries or int(os.getenv("RESPONSE_CACHE_SIZE", 1024))
+        self.ttl_s = ttl_s or float(os.getenv("RESPONSE_CACHE_TTL", 600))
+        self._entries = OrderedDict()
+        self._inflight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def _lookup(self, key: str) -> Optional[str]:
+        # Caller holds the lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] > self.ttl_s:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached answer for key, without counting a miss (for a lookup ahead of routing)"""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_generate(self, key: str, generate: Callable[[], str],
+                        cacheable: Callable[[str], bool] = None) -> Tuple[str, str]:
+        """
+        Return the cached answer, wait for an identical in-flight generation,
+        or generate it
+
+        Args:
+            key: response_key() of the request
+            generate: Produces the answer on a miss
+            cacheable: Whether an answer may be stored (e.g. not error text);
+                an uncacheable answer is still shared with requests already waiting
+
+        Returns:
+            Tuple of (answer, "hit" | "shared" | "miss")
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value, "hit"
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, "shared"
+
+        try:
+            flight.value = generate()
+            if cacheable is None or cacheable(flight.value):
+                self.put(key, flight.value)
+            return flight.value, "miss"
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.shared
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                # Share of requests answered without a generation of their own
+                "hit_rate": round((self.hits + self.shared) / lookups, 3) if lookups else 0.0,
+            }
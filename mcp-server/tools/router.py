@@ -0,0 +1,30 @@
+"""
+Router
+Intent classification prompt shared by /prompt and batch jobs
+"""
+
+ROUTES = ("POSTGRES", "FARMING", "OLLAMA")
+
+
+def build_classification_prompt(user_message: str) -> str:
+    return f"""
+        You are an AI assistant router. Analyze the following user request and decide which tool to use.
+        Available tools:
+        1. POSTGRES: Use this for database queries, checking users, or SQL related tasks.
+        2. FARMING: Use this for questions about farming, agriculture, crops, livestock, or farming practices.
+        3. OLLAMA: Use this for general chat, coding questions, or anything not related to database or farming.
+        
+        User Request: "{user_message}"
+        
+        Reply ONLY with "POSTGRES", "FARMING", or "OLLAMA".
+        """
+
+
+def parse_intent(reply: str) -> str:
+    """Map the router model's reply to a route, defaulting to OLLAMA"""
+    reply = reply.strip().upper()
+    if "FARMING" in reply:
+        return "FARMING"
+    if "POSTGRES" in reply:
+        return "POSTGRES"
+    return "OLLAMA"
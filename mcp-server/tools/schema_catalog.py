@@ -0,0 +1,155 @@
+"""
+Schema Catalog
+Caches a compact description of the database schema for SQL generation prompts
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("mcp.schema_catalog")
+
+
+class SchemaCatalog:
+    def __init__(self, postgres_tool, ttl_s: float = None, check_interval_s: float = None,
+                 max_chars: int = None):
+        """
+        Initialize schema catalog
+
+        Args:
+            postgres_tool: PostgresTool used for introspection connections
+            ttl_s: Seconds after which the catalog is always reloaded
+            check_interval_s: Seconds between cheap schema fingerprint checks
+            max_chars: Upper bound on the rendered prompt text
+        """
+        self.postgres_tool = postgres_tool
+        self.ttl_s = ttl_s or float(os.getenv("SQL_SCHEMA_TTL", 600))
+        self.check_interval_s = check_interval_s or float(os.getenv("SQL_SCHEMA_CHECK_INTERVAL", 30))
+        self.max_chars = max_chars or int(os.getenv("SQL_SCHEMA_MAX_CHARS", 4000))
+        self.schemas = [s.strip() for s in os.getenv("SQL_SCHEMA_NAMES", "public").split(",") if s.strip()]
+
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._text = ""
+        self._fingerprint = None
+        self._loaded_at = None
+        self._checked_at = None
+        self._refreshing = False
+        self._generation = 0
+        self.refresh_count = 0
+
+    def _fetch_fingerprint(self, cursor) -> str:
+        # Table oids, names and column counts change on most DDL and are cheap to
+        # hash; the TTL reload catches the rest (e.g. column type changes)
+        cursor.execute(
+            """
+            SELECT md5(string_agg(c.oid::text || ':' || c.relname || ':' || c.relnatts::text, ',' ORDER BY c.oid))
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind IN ('r', 'v', 'm', 'p') AND n.nspname = ANY(%s)
+            """,
+            (self.schemas,)
+        )
+        return cursor.fetchone()[0] or ""
+
+    def _fetch_tables(self, cursor) -> Dict[str, List[str]]:
+        cursor.execute(
+            """
+            SELECT table_schema, table_name, column_name,
+                   CASE WHEN data_type = 'USER-DEFINED' THEN udt_name ELSE data_type END
+            FROM information_schema.columns
+            WHERE table_schema = ANY(%s)
+            ORDER BY table_schema, table_name, ordinal_position
+            """,
+            (self.schemas,)
+        )
+        tables = {}
+        for schema, table, column, data_type in cursor.fetchall():
+            name = table if schema == "public" else f"{schema}.{table}"
+            tables.setdefault(name, []).append(f"{column} {data_type}")
+        return tables
+
+    def _render(self, tables: Dict[str, List[str]]) -> str:
+        lines = []
+        size = 0
+        for name, columns in tables.items():
+            line = f"{name}({', '.join(columns)})"
+            if size + len(line) + 1 > self.max_chars:
+                lines.append("...")
+                break
+            lines.append(line)
+            size += len(line) + 1
+        return "\n".join(lines)
+
+    def refresh(self, force: bool = False):
+        """
+        Reload the catalog if it expired or the schema fingerprint changed
+
+        Single-flight: the lock only decides whether this caller refreshes, so
+        the introspection queries run without it and concurrent callers keep
+        serving the previous text instead of waiting.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = self._loaded_at is None or now - self._loaded_at >= self.ttl_s
+            due_check = self._checked_at is None or now - self._checked_at >= self.check_interval_s
+            if self._refreshing or not (force or expired or due_check):
+                return
+            self._refreshing = True
+            generation = self._generation
+            known_fingerprint = self._fingerprint
+
+        conn = None
+        try:
+            conn = self.postgres_tool.get_connection()
+            with conn.cursor() as cursor:
+                fingerprint = self._fetch_fingerprint(cursor)
+                tables = None
+                if force or expired or fingerprint != known_fingerprint:
+                    tables = self._fetch_tables(cursor)
+                    text = self._render(tables)
+            with self._lock:
+                # An invalidate() during the queries leaves the catalog due again
+                current = generation == self._generation
+                if current:
+                    self._checked_at = now
+                if tables is not None:
+                    self._tables, self._text, self._fingerprint = tables, text, fingerprint
+                    if current:
+                        self._loaded_at = now
+                    self.refresh_count += 1
+                    logger.info(f"Loaded {len(tables)} tables")
+        except Exception as e:
+            # Keep serving the previous catalog; generation still works without one
+            logger.warning(f"Refresh failed: {e}")
+        finally:
+            if conn:
+                self.postgres_tool.release_connection(conn)
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self):
+        """Force a reload on the next access, e.g. after DDL"""
+        with self._lock:
+            self._loaded_at = None
+            self._checked_at = None
+            self._generation += 1
+
+    def prompt_text(self) -> str:
+        """Compact schema description for the SQL generation prompt"""
+        self.refresh()
+        return self._text
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return self._fingerprint
+
+    def stats(self) -> Dict:
+        return {
+            "tables": len(self._tables),
+            "fingerprint": self._fingerprint,
+            "refresh_count": self.refresh_count,
+            "age_s": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+        }
@@ -0,0 +1,86 @@
+"""
+SQL Guard
+Static checks and plan-cost limits for LLM-generated SQL
+"""
+
+import os
+import re
+from typing import Dict
+
+
+class SQLGuardError(ValueError):
+    """Raised when a generated query is rejected before or after EXPLAIN"""
+
+
+_LITERALS_AND_COMMENTS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.S)
+
+
+class SQLGuard:
+    def __init__(self, max_cost: float = None, max_plan_rows: float = None,
+                 statement_timeout_ms: int = None, row_limit: int = None):
+        """
+        Initialize guard
+
+        Args:
+            max_cost: Highest planner Total Cost accepted for the (limited) query
+            max_plan_rows: Highest row estimate accepted for the query before LIMIT
+            statement_timeout_ms: Per-statement timeout applied to guarded queries
+            row_limit: LIMIT injected around every guarded query
+        """
+        self.max_cost = max_cost or float(os.getenv("SQL_GUARD_MAX_COST", 100000))
+        self.max_plan_rows = max_plan_rows or float(os.getenv("SQL_GUARD_MAX_PLAN_ROWS", 5000000))
+        self.statement_timeout_ms = statement_timeout_ms or int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", 5000))
+        self.row_limit = row_limit or int(os.getenv("SQL_MAX_RESULT_ROWS", 1000))
+
+    def validate(self, query: str) -> str:
+        """
+        Check that a query is a single read statement
+
+        Returns:
+            The query without trailing semicolons
+        """
+        sql = query.strip().rstrip(";").strip()
+        if not sql:
+            raise SQLGuardError("Empty query")
+
+        stripped = _LITERALS_AND_COMMENTS.sub(" ", sql)
+        if ";" in stripped:
+            raise SQLGuardError("Only a single statement is allowed")
+
+        first_word = stripped.strip().split(None, 1)[0].upper()
+        if first_word not in ("SELECT", "WITH"):
+            raise SQLGuardError(f"Only read-only SELECT queries are allowed, got {first_word}")
+
+        return sql
+
+    def apply_limit(self, sql: str, limit: int = None) -> str:
+        """Wrap a validated query so it can never return more than limit rows"""
+        return f"SELECT * FROM (\n{sql}\n) AS guarded_query LIMIT {int(limit or self.row_limit)}"
+
+    def check_plan(self, plan: Dict) -> Dict:
+        """
+        Reject a plan whose cost or row estimate is above the configured limits
+
+        Args:
+            plan: Top-level "Plan" node from EXPLAIN (FORMAT JSON) of the limited query
+
+        Returns:
+            Dict with the estimates that were checked
+        """
+        total_cost = float(plan.get("Total Cost", 0))
+        # The injected Limit caps output rows; its child estimates what the
+        # query itself would produce
+        inner = plan
+        if plan.get("Node Type") == "Limit" and plan.get("Plans"):
+            inner = plan["Plans"][0]
+        plan_rows = float(inner.get("Plan Rows", 0))
+
+        if total_cost > self.max_cost:
+            raise SQLGuardError(
+                f"Query rejected: estimated cost {total_cost:.0f} exceeds limit {self.max_cost:.0f}"
+            )
+        if plan_rows > self.max_plan_rows:
+            raise SQLGuardError(
+                f"Query rejected: estimated {plan_rows:.0f} rows exceeds limit {self.max_plan_rows:.0f}"
+            )
+        return {"estimated_cost": total_cost, "estimated_rows": plan_rows}
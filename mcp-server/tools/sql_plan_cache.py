@@ -0,0 +1,74 @@
+"""
+SQL Plan Cache
+Maps normalized natural-language questions to SQL that already executed successfully
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    text = re.sub(r"\s+", " ", question.strip().lower())
+    return text.rstrip(" ?.!;")
+
+
+class SQLPlanCache:
+    def __init__(self, max_entries: int = None, ttl_s: float = None):
+        """
+        Initialize plan cache
+
+        Args:
+            max_entries: LRU capacity
+            ttl_s: Seconds an entry stays valid
+        """
+        self.max_entries = max_entries or int(os.getenv("SQL_PLAN_CACHE_SIZE", 512))
+        self.ttl_s = ttl_s or float(os.getenv("SQL_PLAN_CACHE_TTL", 3600))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, question: str, schema_fingerprint: Optional[str]) -> tuple:
+        # Schema changes invalidate all plans generated against the old schema
+        return (schema_fingerprint or "", normalize_question(question))
+
+    def get(self, question: str, schema_fingerprint: Optional[str] = None) -> Optional[str]:
+        key = self._key(question, schema_fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl_s:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, question: str, sql: str, schema_fingerprint: Optional[str] = None):
+        """Store SQL for a question; only call once the SQL executed successfully"""
+        key = self._key(question, schema_fingerprint)
+        with self._lock:
+            self._entries[key] = (sql, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, question: str, schema_fingerprint: Optional[str] = None):
+        with self._lock:
+            self._entries.pop(self._key(question, schema_fingerprint), None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }